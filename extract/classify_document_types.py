@@ -5,79 +5,92 @@ Classification script for World Bank download links.
 This script includes:
 1. Language detection to filter non-English documents
 2. File type-based filtering of English documents to only include PDFs
-3. Logging of all classifications for review
+3. A printed summary of all classifications for review
 """
 
 import re
-from typing import List, Optional
+import unicodedata
+from functools import lru_cache
+from typing import List, Optional, Tuple
 import langcodes
+import pycountry
 
 from load.schema import DocumentType
 from extract.extract_publication_details import PublicationDetailsBase
 from extract.classify_mime_types import DownloadLinkWithFileInfo
 
 
-# Filter out common non-language words and short words
-NON_LANGUAGE_WORDS = {
-    "pdf",
-    "download",
-    "file",
-    "document",
-    "report",
-    "mb",
-    "kb",
-    "gb",
-    "summary",
-    "full",
-    "main",
-    "background",
-    "note",
-    "overview",
-    "the",
-    "and",
-    "or",
-    "for",
-    "in",
-    "with",
-    "of",
-    "a",
-    "an",
-    "is",
-    "are",
-    "executive",
-    "technical",
-    "appendix",
-    "annex",
-    "chapter",
-    "section",
-    # Add common English words that were causing false positives
-    "climate",
-    "change",
-    "economic",
-    "damage",
-    "environmental",
-    "risks",
-    "financial",
-    "private",
-    "sector",
-    "forestry",
-    "agroforestry",
-    "assessment",
-    "groundwater",
-    "irrigation",
-    "indicative",
-    "total",
-    "development",
-    "financing",
-    "needs",
-    "estimating",
-    "country",
-}
+# Extracts alphabetic words from link text
+_WORD_RE = re.compile(r"\b[a-zA-Z]+\b")
 
-NON_PDF_INDICATORS = [" text"]
+# Filter out common non-language words and short words
+NON_LANGUAGE_WORDS = frozenset(
+    {
+        "pdf",
+        "download",
+        "file",
+        "document",
+        "report",
+        "mb",
+        "kb",
+        "gb",
+        "summary",
+        "full",
+        "main",
+        "background",
+        "note",
+        "overview",
+        "the",
+        "and",
+        "or",
+        "for",
+        "in",
+        "with",
+        "of",
+        "a",
+        "an",
+        "is",
+        "are",
+        "executive",
+        "technical",
+        "appendix",
+        "annex",
+        "chapter",
+        "section",
+        # Add common English words that were causing false positives
+        "climate",
+        "change",
+        "economic",
+        "damage",
+        "environmental",
+        "risks",
+        "financial",
+        "private",
+        "sector",
+        "forestry",
+        "agroforestry",
+        "assessment",
+        "groundwater",
+        "irrigation",
+        "indicative",
+        "total",
+        "development",
+        "financing",
+        "needs",
+        "estimating",
+        "country",
+        # Country names that pycountry also lists as language names
+        "tonga",
+    }
+)
+
+NON_PDF_INDICATORS = (" text",)
+
+# Check for main report indicators
+MAIN_INDICATORS = ("main report", "full report", "complete report")
 
 # Check for supplementary document indicators
-SUPPLEMENTARY_INDICATORS = [
+SUPPLEMENTARY_INDICATORS = (
     "summary",
     "executive summary",
     "overview",
@@ -87,7 +100,89 @@ SUPPLEMENTARY_INDICATORS = [
     "annex",
     "chapter",
     "brief",
-]
+)
+
+
+# Alternate English names that neither langcodes nor pycountry give as a
+# single-word name (e.g. pycountry's "Scottish Gaelic", "Western Frisian")
+_LANGUAGE_NAME_ALIASES = {
+    "farsi": "fa",
+    "dari": "fa",
+    "mandarin": "zh",
+    "castilian": "es",
+    "kiswahili": "sw",
+    "gaelic": "gd",
+    "sotho": "st",
+    "frisian": "fy",
+    "nepalese": "ne",
+}
+
+# Names that must survive changes to the langcodes/pycountry name data; each
+# was once lost to a renamed ("Bangla") or accented ("Māori") display name
+_REQUIRED_LANGUAGE_NAMES = ("bengali", "maori", "tagalog")
+
+
+def _fold_diacritics(text: str) -> str:
+    """Strip accents so e.g. "māori" becomes "maori" and matches _WORD_RE."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _build_language_name_index() -> dict[str, str]:
+    """Map lowercase single-word English names of non-English ISO 639-1 languages to codes."""
+    index: dict[str, str] = dict(_LANGUAGE_NAME_ALIASES)
+    for language in pycountry.languages:
+        code = getattr(language, "alpha_2", None)
+        if not code or code == "en":
+            continue
+        # langcodes and pycountry disagree on many names (Bangla/Bengali,
+        # Filipino/Tagalog, Pashto/Pushto), so index both
+        names = [
+            langcodes.Language.get(code).display_name("en"),
+            language.name,
+            getattr(language, "common_name", ""),
+        ]
+        for full_name in names:
+            # pycountry lists variants as "Panjabi; Punjabi" and qualifies
+            # names as "Oriya (macrolanguage)"
+            for name in re.split(r"[;,]", re.sub(r"\(.*?\)", "", full_name)):
+                name = _fold_diacritics(name).strip().lower()
+                # Link text is matched word by word, so only single-word names can ever match
+                if _WORD_RE.fullmatch(name):
+                    index.setdefault(name, code)
+
+    missing = [name for name in _REQUIRED_LANGUAGE_NAMES if name not in index]
+    if missing:
+        raise RuntimeError(f"Language name index is missing {', '.join(missing)}")
+    return index
+
+
+_LANG_NAME_TO_CODE = _build_language_name_index()
+
+
+def _compile_indicators(categories: dict[str, Tuple[str, ...]]) -> re.Pattern[str]:
+    """
+    Compile all indicator phrases into one alternation with a named group per category.
+
+    Phrases are tried longest first so that e.g. "executive summary" wins over "summary".
+    """
+    groups = []
+    for category, indicators in categories.items():
+        ordered = sorted(indicators, key=len, reverse=True)
+        alternation = "|".join(re.escape(indicator) for indicator in ordered)
+        groups.append(f"(?P<{category}>{alternation})")
+    return re.compile("|".join(groups))
+
+
+# One scan over the link text finds every indicator category present
+_INDICATOR_RE = _compile_indicators(
+    {
+        "non_pdf": NON_PDF_INDICATORS,
+        "main": MAIN_INDICATORS,
+        "supplementary": SUPPLEMENTARY_INDICATORS,
+        "english": ("english",),
+    }
+)
 
 
 class DownloadLinkWithClassification(DownloadLinkWithFileInfo):
@@ -104,28 +199,34 @@ def detect_language_in_text(text: str) -> Optional[str]:
     """
     Detect if text contains explicit non-English language names.
 
-    This function looks for actual language names in English using langcodes.find(),
-    which is much more precise than fuzzy matching language codes.
+    This function looks up each word in a table of English language names built
+    once from langcodes at import, which is much more precise than fuzzy matching
+    language codes.
 
     Returns:
         Two-letter language code if found, None if not found or if English
     """
+    # Link texts repeat heavily across publications, so memoize on the lowercased text
+    return _detect_language_cached(_fold_diacritics(text.lower()))
+
+
+@lru_cache(maxsize=4096)
+def _detect_language_cached(text_lower: str) -> Optional[str]:
     # Extract words, removing punctuation and size info
-    words = re.findall(r"\b[a-zA-Z]+\b", text.lower())
+    words = _WORD_RE.findall(text_lower)
 
-    filtered_words = [
-        word for word in words if word not in NON_LANGUAGE_WORDS and len(word) > 2
-    ]
+    # Most link texts name English explicitly ("English PDF"); treat that as a
+    # positive English signal and skip the language-name lookups entirely
+    if "english" in words:
+        return None
 
-    for word in filtered_words:
-        try:
-            # Try to find the word as a language name in English
-            lang = langcodes.find(word, language="en")
-            if lang and lang.language != "en":  # Not English
-                return lang.language
-        except LookupError:
-            # Word is not a language name, continue checking other words
+    # Filter and look up in one pass, rejecting short words before the set lookup
+    for word in words:
+        if len(word) <= 2 or word in NON_LANGUAGE_WORDS:
             continue
+        lang = _LANG_NAME_TO_CODE.get(word)
+        if lang:  # Names a non-English language
+            return lang
 
     return None
 
@@ -147,7 +248,8 @@ def classify_download_link(
 
     # Detect language and set default to English
     detected_lang = detect_language_in_text(input.text) or "en"
-    is_pdf = not any(indicator in text_lower for indicator in NON_PDF_INDICATORS)
+    categories = {match.lastgroup for match in _INDICATOR_RE.finditer(text_lower)}
+    is_pdf = "non_pdf" not in categories
 
     if detected_lang != "en" or not is_pdf:
         if verbose:
@@ -156,11 +258,11 @@ def classify_download_link(
             )
         return None
 
-    # Check for main report indicators
-    main_indicators = ["main report", "full report", "complete report"]
+    # Every field is either already validated on the input link or set from a
+    # DocumentType/str here, so skip re-validating (and re-parsing the URL)
     result: DownloadLinkWithClassification
-    if any(indicator in text_lower for indicator in main_indicators):
-        result = DownloadLinkWithClassification(
+    if "main" in categories:
+        result = DownloadLinkWithClassification.model_construct(
             url=input.url,
             text=input.text,
             file_info=input.file_info,
@@ -168,8 +270,8 @@ def classify_download_link(
             language_detected=detected_lang,
             reasoning="Explicitly labeled as main/full/complete report",
         )
-    elif any(indicator in text_lower for indicator in SUPPLEMENTARY_INDICATORS):
-        result = DownloadLinkWithClassification(
+    elif "supplementary" in categories:
+        result = DownloadLinkWithClassification.model_construct(
             url=input.url,
             text=input.text,
             file_info=input.file_info,
@@ -179,8 +281,8 @@ def classify_download_link(
         )
 
     # For "English PDF" without specific indicators, use position heuristic
-    elif "english" in text_lower:
-        result = DownloadLinkWithClassification(
+    elif "english" in categories:
+        result = DownloadLinkWithClassification.model_construct(
             url=input.url,
             text=input.text,
             file_info=input.file_info,
@@ -197,7 +299,7 @@ def classify_download_link(
 
     # Default case - no explicit language or PDF specified
     else:
-        result = DownloadLinkWithClassification(
+        result = DownloadLinkWithClassification.model_construct(
             url=input.url,
             text=input.text,
             file_info=input.file_info,
@@ -225,27 +327,26 @@ def classify_download_links(
 ) -> List[DownloadLinkWithClassification]:
     """
     This function takes the basic download links and enhances them with classification
-    information, then logs the results for review.
+    information, then prints a summary of the results for review.
 
     Args:
-        download_links: List of dicts with 'url' and 'text' keys
-        publication_title: Title of the publication for logging
-        source_url: Source URL for logging
+        download_links: Download links with their file type information
+        verbose: Whether to print the reasoning for each classification
 
     Returns:
         download links with classification information
     """
-    links = [
-        classify_download_link(link, i, verbose)
-        for i, link in enumerate(download_links)
-    ]
-
-    filtered_links = [link for link in links if link]
+    # Classify and keep downloadable links in a single pass
+    filtered_links: List[DownloadLinkWithClassification] = []
+    for i, link in enumerate(download_links):
+        classified = classify_download_link(link, i, verbose)
+        if classified:
+            filtered_links.append(classified)
 
     print("Classification summary:")
-    print(f"  Total links: {len(links)}")
+    print(f"  Total links: {len(download_links)}")
     print(f"  Downloadable: {len(filtered_links)}")
-    print(f"  Skipped: {len(links) - len(filtered_links)}")
+    print(f"  Skipped: {len(download_links) - len(filtered_links)}")
 
     return filtered_links
 
@@ -1,10 +1,22 @@
+import codecs
 import requests
+from requests.adapters import HTTPAdapter
 import re
 import time
 import random
-from typing import List
+import sqlite3
+from contextlib import closing
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import urlsplit
 from pydantic import BaseModel, HttpUrl
-from extract.extract_publication_details import DownloadLink, PublicationDetailsBase
+from extract.extract_publication_details import (
+    DownloadLink,
+    PublicationDetailsBase,
+    parse_retry_after,
+)
 
 # Browser-like headers to avoid rate limiting
 DEFAULT_HEADERS = {
@@ -21,10 +33,60 @@ DEFAULT_HEADERS = {
     "Cache-Control": "max-age=0",
 }
 
+# Matches the charset parameter of a Content-Type header
+_CHARSET_RE = re.compile(r"charset\s*=\s*([^\s;]+)", re.I)
+
+# Pattern for World Bank bitstream download URLs
+_WB_DOWNLOAD_RE = re.compile(
+    r"https://openknowledge\.worldbank\.org/bitstreams/([a-f0-9-]+)/download"
+)
+
+# Whole-word link text markers and the MIME type they suggest, checked in order
+# (whole words so that e.g. "texture" doesn't read as "text")
+_TEXT_TYPE_GUESSES = (
+    (re.compile(r"\bpdf\b", re.I), "application/pdf"),
+    (re.compile(r"\btext\b", re.I), "text/plain"),
+)
+
 # Set to True to store "/content" (post-redirect URL);
 # False to store "/download" (pre-redirect URL)
 STORE_FINAL_URL = True
 
+# Number of links probed concurrently; kept small since nearly all links
+# point at the same host and we don't want to trigger rate limiting
+MAX_CONCURRENT_PROBES = 4
+
+# Shared session so probes reuse keep-alive TCP/TLS connections instead of
+# opening a new one per link (nearly all links are on openknowledge.worldbank.org)
+_SESSION = requests.Session()
+_SESSION.headers.update(DEFAULT_HEADERS)
+_SESSION.mount(
+    "https://", HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=0)
+)
+
+# Bytes of body read for content sniffing; every signature we check for
+# (%PDF-, PK, <!DOCTYPE/<html, JSON brackets) sits at the very start
+SNIFF_BYTES = 512
+
+# Ask for no more than the sniff budget; servers that ignore Range still get cut
+# off when the response is closed after sniffing. Identity encoding makes the
+# range refer to the real body bytes and lets us sniff the first read directly
+# (HEAD probes keep DEFAULT_HEADERS, since they have no body to decode)
+SNIFF_REQUEST_HEADERS = {
+    "Range": f"bytes=0-{SNIFF_BYTES - 1}",
+    "Accept-Encoding": "identity",
+}
+
+# Leading markers of HTML documents (compared after stripping whitespace/BOM, lowercased)
+_HTML_PREFIXES = (b"<!doctype html", b"<html", b"<head", b"<body", b"<!--")
+
+# On-disk cache of probe results so reruns skip the network for known URLs
+FILE_INFO_CACHE_PATH = Path("extract/data/url_file_info_cache.sqlite")
+FILE_INFO_CACHE_TTL_SECONDS = 30 * 24 * 60 * 60  # 30 days
+
+# Hosts that answered HEAD with 405/501; we skip straight to GET for these
+_HEAD_UNSUPPORTED_HOSTS: set[Optional[str]] = set()
+
 
 # Pydantic models for structured data
 class FileTypeInfo(BaseModel):
@@ -58,7 +120,7 @@ def parse_content_type(content_type_str):
     # Extract charset if present
     charset = None
     if len(parts) > 1:
-        charset_match = re.search(r"charset\s*=\s*([^\s;]+)", parts[1], re.I)
+        charset_match = _CHARSET_RE.search(parts[1])
         if charset_match:
             charset = charset_match.group(1).strip("\"'").lower()
 
@@ -67,11 +129,9 @@ def parse_content_type(content_type_str):
 
 def guess_file_type_from_text(text):
     """Guess file type from the link text"""
-    text = text.lower()
-    if "pdf" in text:
-        return "application/pdf"
-    elif "text" in text:
-        return "text/plain"
+    for pattern, mime_type in _TEXT_TYPE_GUESSES:
+        if pattern.search(text):
+            return mime_type
     return None
 
 
@@ -97,15 +157,10 @@ def is_valid_file_info(file_info):
     return True
 
 
+@lru_cache(maxsize=4096)
 def transform_worldbank_url(url: HttpUrl) -> HttpUrl:
     """Transform World Bank download URLs to content URLs for direct file access"""
-    import re
-
-    # Pattern for World Bank bitstream download URLs
-    download_pattern = (
-        r"https://openknowledge\.worldbank\.org/bitstreams/([a-f0-9-]+)/download"
-    )
-    match = re.match(download_pattern, str(url))
+    match = _WB_DOWNLOAD_RE.match(str(url))
 
     if match:
         uuid = match.group(1)
@@ -115,6 +170,143 @@ def transform_worldbank_url(url: HttpUrl) -> HttpUrl:
     return url
 
 
+def compute_backoff(
+    attempt: int,
+    response: Optional[requests.Response] = None,
+    base: float = 2.0,
+    cap: float = 60.0,
+) -> float:
+    """
+    Compute how long to wait before retrying after the given (1-indexed) attempt.
+
+    Uses the response's Retry-After header when present, otherwise exponential
+    backoff with jitter: min(cap, base * 2^(attempt-1)) scaled by 0.5-1.5.
+    """
+    if response is not None:
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None:
+            return retry_after
+    return min(cap, base * (2 ** (attempt - 1))) * random.uniform(0.5, 1.5)
+
+
+def _open_file_info_cache() -> sqlite3.Connection:
+    """Open the file info cache, creating the database and table if needed."""
+    FILE_INFO_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(FILE_INFO_CACHE_PATH, timeout=30)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS cache ("
+        "url TEXT PRIMARY KEY, file_info_json TEXT NOT NULL, fetched_at INTEGER NOT NULL)"
+    )
+    return conn
+
+
+def load_cached_file_info(url: str) -> Optional[FileTypeInfo]:
+    """Return the cached file info for a URL if present and not expired."""
+    try:
+        with closing(_open_file_info_cache()) as conn:
+            row = conn.execute(
+                "SELECT file_info_json FROM cache WHERE url = ? AND fetched_at > ?",
+                (url, int(time.time()) - FILE_INFO_CACHE_TTL_SECONDS),
+            ).fetchone()
+    except sqlite3.Error as e:
+        print(f"Warning: could not read file info cache: {e}")
+        return None
+    return FileTypeInfo.model_validate_json(row[0]) if row else None
+
+
+def store_cached_file_info(url: str, file_info: FileTypeInfo) -> None:
+    """Record a successfully determined file info for a URL."""
+    try:
+        with closing(_open_file_info_cache()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (url, file_info_json, fetched_at) VALUES (?, ?, ?)",
+                (url, file_info.model_dump_json(), int(time.time())),
+            )
+    except sqlite3.Error as e:
+        print(f"Warning: could not write file info cache: {e}")
+
+
+def _sniff_mime(content_start: bytes) -> str:
+    """
+    Classify the first bytes of a body as one of the few types this pipeline cares about.
+
+    Returns application/pdf, application/zip, text/html, application/json,
+    text/plain, or application/octet-stream when nothing matches.
+    """
+    if content_start.startswith(b"%PDF-"):
+        return "application/pdf"
+    if content_start.startswith(b"PK\x03\x04"):
+        return "application/zip"
+
+    head = content_start.removeprefix(b"\xef\xbb\xbf").lstrip().lower()
+    if head.startswith(_HTML_PREFIXES):
+        return "text/html"
+    if head.startswith((b"{", b"[")):
+        return "application/json"
+
+    # Text if it is NUL-free UTF-8 (allowing a multi-byte character cut off at the end)
+    if content_start and b"\x00" not in content_start:
+        try:
+            codecs.getincrementaldecoder("utf-8")().decode(content_start, final=False)
+            return "text/plain"
+        except UnicodeDecodeError:
+            pass
+
+    return "application/octet-stream"
+
+
+def sniff_mime_type(response: requests.Response) -> str:
+    """
+    Detect a streamed response's MIME type from the first SNIFF_BYTES of its body.
+
+    The response is closed right after, so the rest of the body is never transferred.
+    """
+    # iter_content applies Content-Encoding, so gzip'd bodies are sniffed decompressed
+    content_start = b""
+    try:
+        for chunk in response.iter_content(chunk_size=SNIFF_BYTES):
+            content_start += chunk
+            if len(content_start) >= SNIFF_BYTES:
+                break
+    finally:
+        response.close()
+
+    return _sniff_mime(content_start[:SNIFF_BYTES])
+
+
+def probe_content_type_with_head(url: str) -> Optional[dict]:
+    """
+    Get the parsed Content-Type of a URL with a HEAD request (no body transfer).
+
+    Returns:
+        The parsed content type, or None if a GET is needed instead: the host
+        doesn't support HEAD, the request failed, or the type is missing or
+        HTML/JSON and has to be confirmed by sniffing the content.
+    """
+    host = urlsplit(url).hostname
+    if host in _HEAD_UNSUPPORTED_HOSTS:
+        return None
+
+    try:
+        response = _SESSION.head(url, allow_redirects=True, timeout=10)
+    except requests.RequestException:
+        return None
+
+    if response.status_code in (405, 501):
+        # Remember hosts that reject HEAD so we go straight to GET next time
+        _HEAD_UNSUPPORTED_HOSTS.add(host)
+        return None
+    if response.status_code >= 400:
+        # Let the GET path handle rate limiting and errors with its retry logic
+        return None
+
+    parsed = parse_content_type(response.headers.get("Content-Type"))
+    mime_type = parsed["mime_type"]
+    if mime_type == "unknown" or "json" in mime_type or "html" in mime_type:
+        return None
+    return parsed
+
+
 def get_file_type_from_url(
     download_link: DownloadLink, max_retries=3
 ) -> DownloadLinkWithFileInfo:
@@ -131,96 +323,107 @@ def get_file_type_from_url(
     if actual_url != download_link.url:
         print(f"Transformed URL: {download_link.url} -> {actual_url}")
 
+    # Skip all network work if this URL was classified in a recent run
+    cached = load_cached_file_info(str(actual_url))
+    if cached is not None:
+        return DownloadLinkWithFileInfo(
+            url=HttpUrl(actual_url) if STORE_FINAL_URL else download_link.url,
+            text=download_link.text,
+            file_info=cached,
+        )
+
+    # Delay requested by the server (Retry-After) for the next attempt, if any
+    next_wait: Optional[float] = None
+
     for attempt in range(1, max_retries + 1):
         try:
-            # Add random delay between requests
+            # Back off before retrying, honoring the server's guidance when given
             if attempt > 1:
-                wait_time = random.uniform(5, 10)  # Random wait between 5-10 seconds
+                wait_time = (
+                    next_wait if next_wait is not None else compute_backoff(attempt - 1)
+                )
+                next_wait = None
                 print(f"Waiting {wait_time:.1f} seconds before retry...")
                 time.sleep(wait_time)
 
-            # Make a GET request with stream=True to get headers and peek at content
-            with requests.get(
-                str(actual_url),
-                stream=True,
-                allow_redirects=True,
-                headers=DEFAULT_HEADERS,
-            ) as response:
-                # Check for rate limiting
-                if response.status_code == 429:
-                    if attempt == max_retries:
-                        raise Exception(
-                            f"Rate limited (429) after {max_retries} attempts for {download_link.url}"
-                        )
-                    wait_time = random.uniform(15, 30)  # Longer wait for rate limiting
-                    print(
-                        f"Rate limited. Waiting {wait_time:.1f} seconds before retry..."
-                    )
-                    time.sleep(wait_time)
-                    continue
-
-                # Get content type and charset from the FINAL response headers (post-redirect)
-                content_type = response.headers.get("Content-Type", "unknown")
-                parsed_header = parse_content_type(content_type)
-
-                # If we're still getting JSON content type or HTML, try to peek at actual content
-                if (
-                    "json" in parsed_header["mime_type"]
-                    or "html" in parsed_header["mime_type"]
-                ):
-                    # Read first few bytes to detect actual file type
-                    # Use response.content instead of raw to get decompressed content
-                    response_content = response.content
-                    content_start = response_content[:2048]  # Get first 2KB
-
-                    # Use python-magic to detect file type from content
-                    import magic
-
-                    detected_type = magic.from_buffer(content_start, mime=True)
-                    if not detected_type:
-                        detected_type = "application/octet-stream"  # Fallback
-                    parsed_content = parse_content_type(detected_type)
-
-                    # Use detected MIME type, but prefer charset from final response headers
-                    mime_type = parsed_content["mime_type"]
-                    charset = parsed_header["charset"]
-                else:
-                    mime_type = parsed_header["mime_type"]
-                    charset = parsed_header["charset"]
-
-                # Apply UTF-8 fallback if no charset was determined
-                if not charset:
-                    charset = "utf-8"
-                    print(
-                        f"Warning: No charset detected for {download_link.url}, defaulting to UTF-8"
-                    )
-
-                # Log warning if guessed type doesn't match actual MIME type
-                if guessed_type and guessed_type != mime_type:
-                    print(
-                        f"Warning: Guessed type '{guessed_type}' doesn't match detected type '{mime_type}' for {download_link.url}"
-                    )
-
-                result = FileTypeInfo(
-                    mime_type=mime_type,
-                    charset=charset,
+            # Try a bodyless HEAD first; fall back to GET when we need to sniff content
+            parsed_header = probe_content_type_with_head(str(actual_url))
+            if parsed_header is not None:
+                mime_type = parsed_header["mime_type"]
+                charset = parsed_header["charset"]
+            else:
+                # Make a ranged GET request with stream=True to get headers and peek at content.
+                # The context manager closes the response, returning the connection to the pool.
+                with _SESSION.get(
+                    str(actual_url),
+                    headers=SNIFF_REQUEST_HEADERS,
+                    stream=True,
+                    allow_redirects=True,
+                ) as response:
+                    # Check for rate limiting or a temporary server error
+                    if response.status_code == 429 or response.status_code >= 500:
+                        if attempt == max_retries:
+                            raise Exception(
+                                f"HTTP {response.status_code} after {max_retries} attempts for {download_link.url}"
+                            )
+                        next_wait = compute_backoff(attempt, response)
+                        print(f"Got HTTP {response.status_code}, will retry...")
+                        continue
+
+                    # Get content type and charset from the FINAL response headers (post-redirect)
+                    content_type = response.headers.get("Content-Type", "unknown")
+                    parsed_header = parse_content_type(content_type)
+
+                    # If we're still getting JSON content type or HTML, try to peek at actual content
+                    if (
+                        "json" in parsed_header["mime_type"]
+                        or "html" in parsed_header["mime_type"]
+                    ):
+                        # Sniff the first few bytes to detect actual file type
+                        detected_type = sniff_mime_type(response)
+                        parsed_content = parse_content_type(detected_type)
+
+                        # Use detected MIME type, but prefer charset from final response headers
+                        mime_type = parsed_content["mime_type"]
+                        charset = parsed_header["charset"]
+                    else:
+                        mime_type = parsed_header["mime_type"]
+                        charset = parsed_header["charset"]
+
+            # Apply UTF-8 fallback if no charset was determined
+            if not charset:
+                charset = "utf-8"
+                print(
+                    f"Warning: No charset detected for {download_link.url}, defaulting to UTF-8"
                 )
 
-                # If we got HTML when expecting PDF/text, consider it a failure
-                if not is_valid_file_info(result.model_dump()):
-                    if attempt == max_retries:
-                        raise Exception(
-                            f"Failed to get valid file type for {download_link.url} after {max_retries} attempts - got {mime_type}"
-                        )
-                    print("Got unexpected file type, retrying...")
-                    continue
-
-                return DownloadLinkWithFileInfo(
-                    url=HttpUrl(actual_url) if STORE_FINAL_URL else download_link.url,
-                    text=download_link.text,
-                    file_info=result,
+            # Log warning if guessed type doesn't match actual MIME type
+            if guessed_type and guessed_type != mime_type:
+                print(
+                    f"Warning: Guessed type '{guessed_type}' doesn't match detected type '{mime_type}' for {download_link.url}"
                 )
 
+            result = FileTypeInfo(
+                mime_type=mime_type,
+                charset=charset,
+            )
+
+            # If we got HTML when expecting PDF/text, consider it a failure
+            if not is_valid_file_info(result.model_dump()):
+                if attempt == max_retries:
+                    raise Exception(
+                        f"Failed to get valid file type for {download_link.url} after {max_retries} attempts - got {mime_type}"
+                    )
+                print("Got unexpected file type, retrying...")
+                continue
+
+            store_cached_file_info(str(actual_url), result)
+            return DownloadLinkWithFileInfo(
+                url=HttpUrl(actual_url) if STORE_FINAL_URL else download_link.url,
+                text=download_link.text,
+                file_info=result,
+            )
+
         except Exception as e:
             print(f"Attempt {attempt}/{max_retries} failed: {str(e)}")
             if attempt == max_retries:
@@ -232,6 +435,40 @@ def get_file_type_from_url(
     raise Exception(f"Unexpected exit from retry loop for {download_link.url}")
 
 
+def get_file_types_from_urls(
+    download_links: List[DownloadLink], max_workers: int = MAX_CONCURRENT_PROBES
+) -> List[DownloadLinkWithFileInfo]:
+    """
+    Get file types for many links, overlapping the network round-trips.
+
+    Results are returned in the same order as the input links. Each distinct URL
+    is probed once and its result is shared by every link that points at it.
+
+    Raises:
+        Exception: If any link's MIME type cannot be determined (see get_file_type_from_url).
+    """
+    # Keep the first link seen for each URL; that is the one we probe
+    unique_links: dict[str, DownloadLink] = {}
+    for link in download_links:
+        unique_links.setdefault(str(link.url), link)
+
+    if len(unique_links) <= 1:
+        probed = [get_file_type_from_url(link) for link in unique_links.values()]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            probed = list(executor.map(get_file_type_from_url, unique_links.values()))
+
+    probed_by_url = dict(zip(unique_links.keys(), probed))
+    return [
+        DownloadLinkWithFileInfo(
+            url=probed_by_url[str(link.url)].url,
+            text=link.text,
+            file_info=probed_by_url[str(link.url)].file_info,
+        )
+        for link in download_links
+    ]
+
+
 def main():
     # Create a sample DownloadLink
     download_link = DownloadLink(
@@ -7,44 +7,53 @@ This script finds all .bin files recursively in extract/data and
 renames them to .pdf if they are PDF documents.
 """
 
+import json
 import os
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Iterator, Optional
+
+# Every PDF starts with this header; readers tolerate a little leading junk,
+# so we look for it anywhere in the first KB
+PDF_MAGIC = b"%PDF-"
+PDF_SNIFF_BYTES = 1024
+
+# Worker threads for the .bin scan; renames are atomic, so no locking is needed
+MAX_SCAN_WORKERS = 32
+
+# Records .bin files found not to be PDFs, so reruns don't sniff them again
+NON_PDF_CACHE_FILENAME = ".non_pdf_bins.json"
 
 
 def is_pdf_file(file_path: Path) -> bool:
-    """Check if a file is a PDF document using the file command."""
-    try:
-        result = subprocess.run(
-            ["file", str(file_path)], capture_output=True, text=True, check=True
-        )
-        return "PDF document" in result.stdout
-    except subprocess.CalledProcessError:
-        return False
+    """Check if a file is a PDF document by looking for the PDF header bytes."""
+    with file_path.open("rb") as f:
+        return PDF_MAGIC in f.read(PDF_SNIFF_BYTES)
 
 
-def analyze_and_prepare_file(filepath_str: str) -> tuple[str, int]:
+def analyze_and_prepare_file(
+    filepath_str: str, known_size: Optional[int] = None
+) -> tuple[str, int]:
     """
     Analyzes a file, converts it if necessary, measures its size,
     and returns the final path and size.
 
     Args:
         filepath_str: The path to the downloaded file.
+        known_size: The file's size if the caller already knows it (e.g. bytes
+            written during download); skips the stat when provided.
 
     Returns:
         A tuple of (final_file_path, file_size_in_bytes).
     """
     file_path = Path(filepath_str)
 
-    # Check if it's a PDF using the 'file' command
+    # Check if it's a PDF from its header bytes
     try:
-        result = subprocess.run(
-            ["file", str(file_path)], capture_output=True, text=True, check=True
-        )
-        is_pdf = "PDF document" in result.stdout
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        is_pdf = False  # 'file' command might not be available or fails
-        print("  -> Warning: Could not run 'file' command to verify file type.")
+        is_pdf = is_pdf_file(file_path)
+    except OSError:
+        is_pdf = False
+        print("  -> Warning: Could not read file to verify file type.")
 
     # If it's a PDF and has a .bin extension, rename it
     if is_pdf and file_path.suffix == ".bin":
@@ -56,13 +65,71 @@ def analyze_and_prepare_file(filepath_str: str) -> tuple[str, int]:
         # If it's not a PDF or already has the right extension, keep it as is
         final_path = file_path
 
-    # Measure the size of the final file
-    file_size = os.path.getsize(final_path)
+    # Measure the size of the final file (renaming doesn't change it)
+    file_size = known_size if known_size is not None else os.path.getsize(final_path)
     print(f"  -> Final file is '{final_path.name}' with size {file_size} bytes.")
 
     return str(final_path), file_size
 
 
+def iter_bin_files(root: str) -> Iterator[os.DirEntry]:
+    """Yield directory entries for all .bin files under root, using os.scandir."""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(".bin"):
+                    yield entry
+
+
+def convert_bin_file(bin_file: Path) -> tuple[Optional[bool], str]:
+    """
+    Rename a .bin file to .pdf if it is a PDF document.
+
+    Returns:
+        A tuple of (whether the file was a PDF, or None if it couldn't be read;
+        a status message).
+    """
+    try:
+        is_pdf = is_pdf_file(bin_file)
+    except OSError as e:
+        return None, f"Could not read {bin_file}: {e}"
+
+    if not is_pdf:
+        return False, f"Not a PDF: {bin_file}"
+
+    # Create new filename with .pdf extension
+    new_name = bin_file.with_suffix(".pdf")
+    bin_file.rename(new_name)
+    return True, f"Renamed PDF: {bin_file} -> {new_name}"
+
+
+def non_pdf_cache_key(entry: os.DirEntry) -> str:
+    """Key a .bin file by path, size and mtime, so any change invalidates it."""
+    stat = entry.stat()  # Cached on the DirEntry by os.scandir
+    return f"{entry.path}:{stat.st_size}:{int(stat.st_mtime)}"
+
+
+def load_non_pdf_cache(cache_path: Path) -> set[str]:
+    """Load the keys of .bin files already known not to be PDFs."""
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return set(json.load(f))
+    except (OSError, ValueError):
+        return set()
+
+
+def save_non_pdf_cache(cache_path: Path, keys: set[str]) -> None:
+    """Atomically write the non-PDF cache."""
+    tmp_path = cache_path.with_name(f"{cache_path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(sorted(keys), f)
+    os.replace(tmp_path, cache_path)
+
+
 def main():
     """Find and convert .bin files to .pdf if they are PDF documents."""
     data_dir = Path("extract/data")
@@ -71,23 +138,38 @@ def main():
         print(f"Directory {data_dir} does not exist")
         return
 
-    # Find all .bin files recursively
-    bin_files = list(data_dir.rglob("*.bin"))
-
-    if not bin_files:
+    # Find all .bin files recursively, skipping ones a previous run already
+    # found not to be PDFs (and which haven't changed since)
+    cache_path = data_dir / NON_PDF_CACHE_FILENAME
+    known_non_pdfs = load_non_pdf_cache(cache_path)
+    entries = list(iter_bin_files(str(data_dir)))
+    keys = [non_pdf_cache_key(entry) for entry in entries]
+    to_check = [
+        (Path(entry.path), key)
+        for entry, key in zip(entries, keys)
+        if key not in known_non_pdfs
+    ]
+
+    if not entries:
         print("No .bin files found")
         return
 
-    print(f"Found {len(bin_files)} .bin files")
-
-    for bin_file in bin_files:
-        if is_pdf_file(bin_file):
-            # Create new filename with .pdf extension
-            new_name = bin_file.with_suffix(".pdf")
-            print(f"Renaming PDF: {bin_file} -> {new_name}")
-            bin_file.rename(new_name)
-        else:
-            print(f"Not a PDF: {bin_file}")
+    print(
+        f"Found {len(entries)} .bin files "
+        f"({len(entries) - len(to_check)} already known not to be PDFs)"
+    )
+
+    # Each file is independent and the work is I/O-bound, so overlap the reads
+    # and renames; messages are printed afterwards in discovery order
+    non_pdfs = known_non_pdfs & set(keys)  # Drop entries for files that are gone
+    with ThreadPoolExecutor(max_workers=MAX_SCAN_WORKERS) as executor:
+        results = executor.map(convert_bin_file, [path for path, _ in to_check])
+        for (_, key), (is_pdf, message) in zip(to_check, results):
+            print(message)
+            if is_pdf is False:
+                non_pdfs.add(key)
+
+    save_non_pdf_cache(cache_path, non_pdfs)
 
 
 if __name__ == "__main__":
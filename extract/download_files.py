@@ -1,28 +1,237 @@
 import json
+import logging
 import os
+import queue
 from pathlib import Path
 import requests
+from requests.adapters import HTTPAdapter
+import urllib3
+from urllib3.util.retry import Retry
 from tqdm import tqdm
+from tqdm.utils import CallbackIOWrapper
 import mimetypes
+from functools import lru_cache
+from itertools import takewhile
 import time
 import random
-from typing import Optional
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+from typing import BinaryIO, Optional, Tuple
 from load.schema import Document
 
+logger = logging.getLogger(__name__)
+
+
+class DownloadRetry(Retry):
+    """
+    Retry whose exponential backoff also applies before the first retry.
+
+    urllib3 sleeps 0s before the first retry of a consecutive run of errors,
+    which would re-hit a host that has just rate-limited us without waiting.
+    """
+
+    def get_backoff_time(self) -> float:
+        # Only the last run of consecutive errors counts (redirects reset it)
+        consecutive_errors_len = len(
+            list(
+                takewhile(lambda x: x.redirect_location is None, reversed(self.history))
+            )
+        )
+        if consecutive_errors_len == 0:
+            return 0
+
+        backoff_value = self.backoff_factor * (2 ** (consecutive_errors_len - 1))
+        if self.backoff_jitter != 0.0:
+            backoff_value += random.random() * self.backoff_jitter
+        return float(max(0, min(self.backoff_max, backoff_value)))
+
+
+# Retries for downloads: connection errors and rate-limit/server-error statuses
+# are retried by urllib3 with jittered exponential backoff (10s, 20s, 40s, 80s,
+# plus up to 5s of jitter each), honoring the server's Retry-After on 429/503
+DOWNLOAD_RETRY = DownloadRetry(
+    total=4,
+    backoff_factor=10,
+    backoff_max=300,
+    backoff_jitter=5,
+    status_forcelist=[429, 500, 502, 503, 504],
+    respect_retry_after_header=True,
+    raise_on_status=False,  # Hand back the last response so raise_for_status reports it
+)
+
+# Shared session so consecutive downloads reuse keep-alive TCP/TLS connections
+# to openknowledge.worldbank.org instead of handshaking per document
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=DOWNLOAD_RETRY),
+)
+
+# Downloads run concurrently in main(), but starts are spaced out across threads
+# so the server sees a steady, polite request rate rather than bursts
+MAX_CONCURRENT_DOWNLOADS = 4
+MIN_SECONDS_BETWEEN_DOWNLOADS = 5.0
+_download_gate_lock = threading.Lock()
+_next_download_at = 0.0
+
+# Socket read size for downloads and the write buffer in front of the file;
+# large enough that a 100 MB PDF takes hundreds, not thousands, of loop trips
+DOWNLOAD_CHUNK_BYTES = 256 * 1024
+DOWNLOAD_BUFFER_BYTES = 1024 * 1024
+
+# Minimum time between progress bar redraws
+PROGRESS_REFRESH_SECONDS = 0.25
+
+# Order of preference where a download exists under several extensions
+# (".bin" is the placeholder for unknown types, ".pdf" also covers converted
+# .bin files); any other extension ranks after these
+PREFERRED_DOWNLOAD_EXTENSIONS = (
+    ".pdf",
+    ".bin",
+    ".txt",
+    ".html",
+    ".zip",
+    ".docx",
+    ".xlsx",
+    "",
+)
+
+# Extensions of unfinished writes, which never count as a download
+PARTIAL_DOWNLOAD_EXTENSIONS = (".part", ".tmp")
+
 
 def ensure_directory(path):
     """Create directory if it doesn't exist"""
     Path(path).mkdir(parents=True, exist_ok=True)
 
 
-def get_extension_from_headers(headers):
-    """Extract file extension from Content-Type header"""
-    content_type = headers.get("content-type", "").split(";")[0]
-    ext = mimetypes.guess_extension(content_type) or ""
-    return ext
+@lru_cache(maxsize=None)
+def list_existing_downloads(directory: str) -> dict[str, Path]:
+    """
+    Map the stem of each already-downloaded file in directory to its path.
+
+    The directory is scanned once per process; downloads made afterwards are
+    added by record_download. A file counts under any extension, since the
+    extension comes from the server's Content-Type. Where a stem exists under
+    several extensions, the one listed first in PREFERRED_DOWNLOAD_EXTENSIONS
+    wins.
+    """
+    rank = {ext: i for i, ext in enumerate(PREFERRED_DOWNLOAD_EXTENSIONS)}
+    found: dict[str, Path] = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            stem, ext = os.path.splitext(entry.name)
+            if ext in PARTIAL_DOWNLOAD_EXTENSIONS or not entry.is_file():
+                continue
+            current = found.get(stem)
+            ext_rank = rank.get(ext, len(rank))
+            if current is None or ext_rank < rank.get(current.suffix, len(rank)):
+                found[stem] = Path(entry.path)
+    return found
+
+
+def find_existing_download(directory: Path, stem: str) -> Optional[Path]:
+    """Return an already-downloaded file named stem plus any extension, if any."""
+    return list_existing_downloads(str(directory)).get(stem)
+
+
+def record_download(directory: Path, stem: str, path: Path) -> None:
+    """Add a finished download to the cached listing of its directory."""
+    list_existing_downloads(str(directory))[stem] = path
+
+
+def stream_response_to_file(
+    response: requests.Response, f: BinaryIO, pbar: tqdm
+) -> None:
+    """Copy a streamed response body into f in large chunks, advancing pbar per chunk."""
+    # Reading raw bypasses requests' decoding, so ask urllib3 to decode gzip etc.
+    response.raw.decode_content = True
+    # Reading raw also bypasses requests' exception wrapping, so map urllib3's
+    # errors the way iter_content would (a dropped connection must surface as
+    # a RequestException, not slip past the callers' error handling)
+    try:
+        shutil.copyfileobj(
+            response.raw,
+            CallbackIOWrapper(pbar.update, f, "write"),
+            length=DOWNLOAD_CHUNK_BYTES,
+        )
+    except urllib3.exceptions.ProtocolError as e:
+        raise requests.exceptions.ChunkedEncodingError(e) from e
+    except urllib3.exceptions.DecodeError as e:
+        raise requests.exceptions.ContentDecodingError(e) from e
+    except urllib3.exceptions.ReadTimeoutError as e:
+        raise requests.exceptions.ConnectionError(e) from e
+    except urllib3.exceptions.SSLError as e:
+        raise requests.exceptions.SSLError(e) from e
+
+
+def drop_from_page_cache(f: BinaryIO) -> None:
+    """
+    Write f out to disk and tell the kernel its pages needn't stay cached,
+    since downloads aren't read again until a much later pipeline step. The
+    kernel only drops clean pages, hence the fdatasync before the advice; its
+    cost is small next to the download itself. Best effort: a no-op where
+    posix_fadvise isn't available.
+    """
+    f.flush()
+    try:
+        os.fdatasync(f.fileno())
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    except (AttributeError, OSError):
+        pass
+
 
+def write_response_to_file(
+    response: requests.Response, filepath: Path, desc: str
+) -> int:
+    """
+    Stream a response body to filepath with a progress bar, returning the number
+    of bytes written.
 
-def download_document_file(doc: Document, base_data_dir: str = "extract/data") -> str:
+    The body goes to a ".part" file that is renamed into place only once it is
+    complete, so an interrupted download never leaves a file that a later run
+    would take as already downloaded.
+    """
+    part_path = filepath.with_name(f"{filepath.name}.part")
+    total_size = int(response.headers.get("content-length", 0))
+    try:
+        with (
+            open(part_path, "wb", buffering=DOWNLOAD_BUFFER_BYTES) as f,
+            tqdm(
+                desc=desc,
+                total=total_size,
+                unit="iB",
+                unit_scale=True,
+                unit_divisor=1024,
+                mininterval=PROGRESS_REFRESH_SECONDS,
+            ) as pbar,
+        ):
+            stream_response_to_file(response, f, pbar)
+            drop_from_page_cache(f)
+        os.replace(part_path, filepath)
+    finally:
+        if part_path.exists():
+            part_path.unlink()
+    # The bar's count doubles as the file size so callers needn't stat the file
+    return pbar.n
+
+
+@lru_cache(maxsize=64)
+def get_extension_for_content_type(content_type: str) -> str:
+    """Map a bare, lowercased MIME type to a file extension ("" if unknown)"""
+    return mimetypes.guess_extension(content_type) or ""
+
+
+def get_extension_from_content_type(content_type: str) -> str:
+    """Extract file extension from a lowercased Content-Type header value"""
+    return get_extension_for_content_type(content_type.split(";")[0].strip())
+
+
+def download_document_file(
+    doc: Document, base_data_dir: str = "extract/data"
+) -> Tuple[str, Optional[int]]:
     """
     Downloads a single file for a given Document object.
 
@@ -31,7 +240,8 @@ def download_document_file(doc: Document, base_data_dir: str = "extract/data") -
         base_data_dir: The base directory to save data.
 
     Returns:
-        The full path to the downloaded file.
+        A tuple of (full path to the downloaded file, bytes written). The size is
+        None when an already-downloaded file was reused.
     """
     # Create a stable, local path
     pub_dir = Path(base_data_dir) / f"pub_{doc.publication_id}"
@@ -42,158 +252,102 @@ def download_document_file(doc: Document, base_data_dir: str = "extract/data") -
     temp_filename = f"doc_{doc.id}.bin"
     local_filepath = pub_dir / temp_filename
 
-    # Use the existing download logic with retries and progress bar
-    session = requests.Session()
-    max_retries = 4
-
-    for attempt in range(1, max_retries + 1):
-        try:
-            # Check if a file with the same base name already exists
-            for file in os.listdir(pub_dir):
-                if file.startswith(f"doc_{doc.id}"):
-                    print(f"  -> File {file} already exists, skipping download")
-                    return str(pub_dir / file)
-
-            # Make the request with streaming enabled
-            response = session.get(doc.download_url, allow_redirects=True, stream=True)
-            response.raise_for_status()
-
-            # Check for rate limiting
-            if response.status_code == 429:
-                if attempt == max_retries:
-                    raise Exception("Maximum retries reached - rate limit persists")
-
-                # Exponential backoff with random component
-                base_wait = min(300, 15 * (2 ** (attempt - 1)))  # Cap at 5 minutes
-                wait_time = random.uniform(base_wait, base_wait * 1.5)
-                print(
-                    f"  -> Rate limited. Waiting {wait_time:.1f} seconds before retry (attempt {attempt}/{max_retries})..."
-                )
-                time.sleep(wait_time)
-                continue
-
-            # Get extension from headers
-            ext = get_extension_from_headers(response.headers)
-            if not ext and "pdf" in response.headers.get("content-type", "").lower():
-                ext = ".pdf"  # Force .pdf extension for PDF files
-
-            # Update filename with proper extension if we got one
-            if ext:
-                final_filename = f"doc_{doc.id}{ext}"
-                final_filepath = pub_dir / final_filename
-            else:
-                final_filepath = local_filepath
-
-            # Get total file size for progress bar
-            total_size = int(response.headers.get("content-length", 0))
-
-            # Download with progress bar
-            with (
-                open(final_filepath, "wb") as f,
-                tqdm(
-                    desc=f"doc_{doc.id}",
-                    total=total_size,
-                    unit="iB",
-                    unit_scale=True,
-                    unit_divisor=1024,
-                ) as pbar,
-            ):
-                for data in response.iter_content(chunk_size=8192):
-                    size = f.write(data)
-                    pbar.update(size)
-
-            print(f"  -> Downloaded to: {final_filepath}")
-            return str(final_filepath)
-
-        except Exception as e:
-            if attempt == max_retries:
-                raise Exception(
-                    f"Failed to download after {max_retries} attempts: {str(e)}"
-                )
-
-            # Exponential backoff with random component for other errors
-            base_wait = min(120, 10 * (2 ** (attempt - 1)))  # Cap at 2 minutes
-            wait_time = random.uniform(base_wait, base_wait * 1.5)
-            print(
-                f"  -> Error encountered. Waiting {wait_time:.1f} seconds before retry (attempt {attempt}/{max_retries})..."
-            )
-            time.sleep(wait_time)
-
-    raise Exception("Download failed after all retries")
-
-
-def download_file(url, output_path, file_id, max_retries=4) -> Optional[str]:
+    # Check if this document was already downloaded (by exact name, so that
+    # doc_1 doesn't match doc_12.pdf)
+    existing = find_existing_download(pub_dir, f"doc_{doc.id}")
+    if existing:
+        logger.info(f"  -> File {existing.name} already exists, skipping download")
+        return str(existing), None
+
+    # Download with a progress bar; retries happen inside the session's adapter
+    try:
+        # Make the request with streaming enabled
+        response = _SESSION.get(doc.download_url, allow_redirects=True, stream=True)
+        response.raise_for_status()
+
+        # Get extension from the Content-Type header (read once)
+        content_type = response.headers.get("content-type", "").lower()
+        ext = get_extension_from_content_type(content_type)
+        if not ext and "pdf" in content_type:
+            ext = ".pdf"  # Force .pdf extension for PDF files
+
+        # Update filename with proper extension if we got one
+        if ext:
+            final_filename = f"doc_{doc.id}{ext}"
+            final_filepath = pub_dir / final_filename
+        else:
+            final_filepath = local_filepath
+
+        bytes_written = write_response_to_file(
+            response, final_filepath, f"doc_{doc.id}"
+        )
+    except (requests.RequestException, OSError) as e:
+        raise Exception(f"Failed to download {doc.download_url}: {e}") from e
+
+    record_download(pub_dir, f"doc_{doc.id}", final_filepath)
+    logger.info(f"  -> Downloaded to: {final_filepath}")
+    return str(final_filepath), bytes_written
+
+
+def download_file(url, output_path, file_id) -> Optional[str]:
     """Download a file with progress bar using file_id as the base filename"""
-    session = requests.Session()
-
-    for attempt in range(1, max_retries + 1):
-        try:
-            # Check if a file with the same name already exists
-            for file in os.listdir(output_path):
-                if file.startswith(file_id):
-                    print(f"File {file} already exists, skipping download")
-                    return None
-
-            # Make the request with streaming enabled
-            response = session.get(url, allow_redirects=True, stream=True)
-            response.raise_for_status()
-
-            # Check for rate limiting
-            if response.status_code == 429:
-                if attempt == max_retries:
-                    raise Exception("Maximum retries reached - rate limit persists")
-
-                # Exponential backoff with random component
-                base_wait = min(300, 15 * (2 ** (attempt - 1)))  # Cap at 5 minutes
-                wait_time = random.uniform(base_wait, base_wait * 1.5)
-                print(
-                    f"Rate limited. Waiting {wait_time:.1f} seconds before retry (attempt {attempt}/{max_retries})..."
-                )
-                time.sleep(wait_time)
-                continue
-
-            # Get extension from headers
-            ext = get_extension_from_headers(response.headers)
-            if not ext and "pdf" in response.headers.get("content-type", "").lower():
-                ext = ".pdf"  # Force .pdf extension for PDF files
-            filename = f"{file_id}{ext}"
-            full_path = os.path.join(output_path, filename)
-
-            # Get total file size for progress bar
-            total_size = int(response.headers.get("content-length", 0))
-
-            # Download with progress bar
-            with (
-                open(full_path, "wb") as f,
-                tqdm(
-                    desc=filename,
-                    total=total_size,
-                    unit="iB",
-                    unit_scale=True,
-                    unit_divisor=1024,
-                ) as pbar,
-            ):
-                for data in response.iter_content(chunk_size=1024):
-                    size = f.write(data)
-                    pbar.update(size)
-
-            print(f"Successfully downloaded to {full_path}")
-            return full_path
-
-        except Exception as e:
-            if attempt == max_retries:
-                raise Exception(
-                    f"Failed to download after {max_retries} attempts: {str(e)}"
-                )
-
-            # Exponential backoff with random component for other errors
-            base_wait = min(120, 10 * (2 ** (attempt - 1)))  # Cap at 2 minutes
-            wait_time = random.uniform(base_wait, base_wait * 1.5)
-            print(
-                f"Error encountered. Waiting {wait_time:.1f} seconds before retry (attempt {attempt}/{max_retries})..."
-            )
-            time.sleep(wait_time)
-    return None
+    # Check if a file with the same name already exists
+    existing = find_existing_download(Path(output_path), file_id)
+    if existing:
+        logger.info(f"File {existing.name} already exists, skipping download")
+        return None
+
+    # Only real downloads take a slot, so a rerun skips finished files at once
+    wait_for_download_slot()
+
+    # Retries happen inside the session's adapter
+    try:
+        # Make the request with streaming enabled
+        response = _SESSION.get(url, allow_redirects=True, stream=True)
+        response.raise_for_status()
+
+        # Get extension from the Content-Type header (read once)
+        content_type = response.headers.get("content-type", "").lower()
+        ext = get_extension_from_content_type(content_type)
+        if not ext and "pdf" in content_type:
+            ext = ".pdf"  # Force .pdf extension for PDF files
+        filename = f"{file_id}{ext}"
+        full_path = os.path.join(output_path, filename)
+
+        write_response_to_file(response, Path(full_path), filename)
+    except (requests.RequestException, OSError) as e:
+        raise Exception(f"Failed to download {url}: {e}") from e
+
+    record_download(Path(output_path), file_id, Path(full_path))
+    logger.info(f"Successfully downloaded to {full_path}")
+    return full_path
+
+
+def wait_for_download_slot() -> None:
+    """Block until this thread may start a download, spacing starts across all threads."""
+    global _next_download_at
+    with _download_gate_lock:
+        now = time.monotonic()
+        start_at = max(now, _next_download_at)
+        _next_download_at = start_at + random.uniform(
+            MIN_SECONDS_BETWEEN_DOWNLOADS, MIN_SECONDS_BETWEEN_DOWNLOADS * 1.5
+        )
+    if start_at > now:
+        time.sleep(start_at - now)
+
+
+def start_log_listener() -> QueueListener:
+    """
+    Route log records through a queue drained by a background thread, so
+    download threads only enqueue records instead of writing to the terminal.
+    """
+    log_queue: queue.Queue = queue.Queue()
+    logging.basicConfig(
+        level=logging.INFO, format="%(message)s", handlers=[QueueHandler(log_queue)]
+    )
+    listener = QueueListener(log_queue, logging.StreamHandler())
+    listener.start()
+    return listener
 
 
 def main():
@@ -201,29 +355,33 @@ def main():
     with open("extract/data/publication_details.json", "r") as f:
         publications = json.load(f)
 
-    # Process each publication
-    for idx, pub in enumerate(publications):
+    # Collect every file marked for download
+    jobs = []
+    for pub in publications:
         pub_id = pub["id"]
         pub_dir = f"extract/data/{pub_id}"
         ensure_directory(pub_dir)
 
-        # Download files marked for download
         for link in pub["downloadLinks"]:
             if link.get("to_download", False):
-                try:
-                    print(f"\nDownloading {link['text']} for publication {pub_id}")
-                    path = download_file(link["url"], pub_dir, link["id"])
-                    if path:
-                        # Add delay between publications with small random component
-                        if idx > 0:
-                            base_wait = 20
-                            wait_time = random.uniform(base_wait, base_wait * 1.5)
-                            print(
-                                f"\nWaiting {wait_time:.1f} seconds before next publication..."
-                            )
-                            time.sleep(wait_time)
-                except Exception as e:
-                    print(f"Error downloading {link['url']}: {str(e)}")
+                jobs.append((pub_id, pub_dir, link))
+
+    def download_job(job) -> None:
+        pub_id, pub_dir, link = job
+        try:
+            logger.info(f"\nDownloading {link['text']} for publication {pub_id}")
+            download_file(link["url"], pub_dir, link["id"])
+        except Exception as e:
+            logger.error(f"Error downloading {link['url']}: {str(e)}")
+
+    # Overlap downloads on a small pool; the shared gate keeps request starts
+    # spaced out, and 429 backoff still happens in the session's adapter
+    listener = start_log_listener()
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_DOWNLOADS) as executor:
+            list(executor.map(download_job, jobs))
+    finally:
+        listener.stop()  # Flushes any records still in the queue
 
 
 if __name__ == "__main__":
@@ -1,10 +1,24 @@
-import time
+import asyncio
+import hashlib
+import logging
+import os
 import random
-from playwright.sync_api import sync_playwright
-from typing import Optional, List
+import re
+import time
+import requests
+from bs4 import BeautifulSoup, Tag
+from contextlib import asynccontextmanager
+from pathlib import Path
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from playwright.async_api import Browser, BrowserContext, Route, async_playwright
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, List
+from urllib.parse import urlsplit
 
 from pydantic import HttpUrl, BaseModel
 
+logger = logging.getLogger(__name__)
+
 
 # Pydantic models for structured data
 class DownloadLink(BaseModel):
@@ -39,466 +53,967 @@ class PublicationDetails(PublicationDetailsBase):
     download_links: List[DownloadLink] = []
 
 
-def scrape_publication_details_with_retry(
+class RateLimited(Exception):
+    """Raised when the server rate-limits a page load (429 or 503)."""
+
+    def __init__(self, status: int, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status}, retry after {retry_after}s")
+        self.status = status
+        self.retry_after = retry_after  # From the Retry-After header, if sent
+
+
+class PublicationNotFound(Exception):
+    """Raised when a publication page is gone (404 or 410), so retrying is futile."""
+
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# Chromium flags for the scraping browser
+LAUNCH_ARGS = (
+    "--no-sandbox",
+    "--disable-blink-features=AutomationControlled",
+    "--disable-web-security",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+    "--disable-features=TranslateUI",
+    "--disable-ipc-flooding-protection",
+)
+
+# Browser context settings that look like a regular desktop Chrome
+CONTEXT_OPTIONS: dict[str, Any] = {
+    "user_agent": USER_AGENT,
+    "viewport": {"width": 1920, "height": 1080},
+    "locale": "en-US",
+    "timezone_id": "America/New_York",
+    "extra_http_headers": {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+        "Accept-Language": "en-US,en;q=0.9",
+        "Accept-Encoding": "gzip, deflate, br",
+        "DNT": "1",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+        "Sec-Fetch-Dest": "document",
+        "Sec-Fetch-Mode": "navigate",
+        "Sec-Fetch-Site": "none",
+        "Sec-Fetch-User": "?1",
+        "Cache-Control": "max-age=0",
+    },
+}
+
+# Hides automation indicators from page scripts
+STEALTH_INIT_SCRIPT = """
+Object.defineProperty(navigator, 'webdriver', {
+    get: () => undefined,
+});
+
+// Remove automation indicators
+delete window.cdc_adoQpoasnfa76pfcZLmcfl_Array;
+delete window.cdc_adoQpoasnfa76pfcZLmcfl_Promise;
+delete window.cdc_adoQpoasnfa76pfcZLmcfl_Symbol;
+"""
+
+# Plain HTTP session for fetch_publication_details_without_browser
+_SESSION = requests.Session()
+_SESSION.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "en-US,en;q=0.9"})
+FAST_PATH_TIMEOUT_SECONDS = 10
+
+# Resource types the scraper never needs. Stylesheets are deliberately kept:
+# innerText depends on CSS visibility, so dropping them could change the text
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+
+# Scripts and stylesheets are the same on every publication page, but Playwright
+# turns off the browser's HTTP cache while routing is on, so keep our own disk
+# cache of them. Entries older than STATIC_CACHE_MAX_AGE_SECONDS are refetched
+# in case the site has been redeployed under the same asset URLs
+STATIC_CACHE_DIR = Path("extract/data/.static_cache")
+STATIC_CACHE_EXTENSIONS = (".css", ".js")
+STATIC_CACHE_MAX_AGE_SECONDS = 24 * 60 * 60
+
+# Third-party analytics/ad hosts (and their subdomains) the page pulls in
+BLOCKED_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "siteimproveanalytics.com",
+    "siteimproveanalytics.io",
+    "hotjar.com",
+    "newrelic.com",
+    "nr-data.net",
+)
+
+# Publication pages scraped at once by scrape_many_publication_details; kept
+# small since every page is on openknowledge.worldbank.org, which rate-limits
+MAX_CONCURRENT_PAGES = 4
+
+# Pages scraped in one browser context before it is swapped for a fresh one, so
+# cookies, cache and renderer memory don't build up over a long run
+MAX_PAGES_PER_CONTEXT = 100
+
+# Substrings of a page's title or body text that mean we've been rate limited
+# or the server is struggling (matched case-insensitively)
+RATE_LIMIT_INDICATORS = (
+    "429",
+    "too many requests",
+    "rate limit",
+    "slow down",
+    "try again later",
+    "temporarily unavailable",
+    "service unavailable",
+    "connection refused",
+    "server error",
+)
+
+# Substrings of a page title that mean we got an error page (case-insensitive)
+ERROR_TITLE_INDICATORS = (
+    "429",
+    "too many requests",
+    "error",
+    "not found",
+    "unavailable",
+    "refused",
+)
+
+# Substrings of a scraping exception's message that indicate rate limiting or
+# a temporary issue, or an error that retrying won't fix
+TEMPORARY_ERRORS = (
+    "ERR_CONNECTION_REFUSED",
+    "ERR_CONNECTION_RESET",
+    "ERR_CONNECTION_FAILED",
+    "ERR_NETWORK_CHANGED",
+    "ERR_TIMED_OUT",
+    "net::",
+    "Connection refused",
+    "Connection reset",
+    "Timeout",
+    "429",
+    "503",
+    "502",
+    "504",
+)
+PERMANENT_ERRORS = (
+    "404",
+    "Not Found",
+    "ERR_NAME_NOT_RESOLVED",
+    "ERR_INVALID_URL",
+)
+
+# Each list above as one alternation, so a check is a single C-level scan
+_RATE_LIMIT_RE = re.compile("|".join(map(re.escape, RATE_LIMIT_INDICATORS)), re.I)
+_ERROR_TITLE_RE = re.compile("|".join(map(re.escape, ERROR_TITLE_INDICATORS)), re.I)
+_TEMPORARY_ERROR_RE = re.compile("|".join(map(re.escape, TEMPORARY_ERRORS)))
+_PERMANENT_ERROR_RE = re.compile("|".join(map(re.escape, PERMANENT_ERRORS)))
+
+# h5 field labels read from a publication page
+DETAIL_FIELD_LABELS = ["Abstract", "Citation", "Date", "Published", "Author(s)"]
+
+# Download links on a publication page
+BITSTREAM_LINK_SELECTOR = 'a[href*="/bitstreams/"]'
+
+# The page has rendered once its title and metadata headings are in the DOM.
+# Download links aren't required: some publications have none, and those
+# pages must not be mistaken for a load timeout
+PAGE_READY_JS = """
+() => Boolean(document.querySelector("h2") && document.querySelector("h5"))
+"""
+
+# The start of the page's visible text, enough to spot a rate-limit or error
+# page without shipping a whole publication page's text over CDP
+BODY_TEXT_PREFIX_JS = """
+() => (document.body ? document.body.innerText : "").slice(0, 4000)
+"""
+
+# After clicking SHOW MORE (called with the link count before the click)
+MORE_LINKS_LOADED_JS = f"""
+(before) => document.querySelectorAll('{BITSTREAM_LINK_SELECTOR}').length > before
+"""
+
+# Extracts everything we need from a publication page in one browser round-trip
+# (called with DETAIL_FIELD_LABELS). Each field's value is the first element
+# after its h5 heading (within the heading's parent) that has its own text,
+# falling back to the heading's next sibling; the URI is the first handle/DOI
+# link under the "URI" heading.
+EXTRACT_DETAILS_JS = """
+(labels) => {
+    const headings = Array.from(document.querySelectorAll("h5"));
+    const ownText = (el) =>
+        Array.from(el.childNodes)
+            .filter((n) => n.nodeType === Node.TEXT_NODE)
+            .map((n) => n.textContent)
+            .join("")
+            .trim();
+
+    const fieldValue = (heading) => {
+        const parent = heading.parentElement;
+        if (parent) {
+            let passedHeading = false;
+            for (const el of parent.querySelectorAll("*")) {
+                if (el === heading) {
+                    passedHeading = true;
+                    continue;
+                }
+                if (!passedHeading || heading.contains(el)) continue;
+                if (ownText(el)) return el.innerText.trim() || null;
+            }
+        }
+        const next = heading.nextElementSibling;
+        return next ? next.innerText.trim() || null : undefined;
+    };
+
+    const fields = {};
+    for (const label of labels) {
+        for (const heading of headings) {
+            if (heading.innerText.trim() !== label) continue;
+            const value = fieldValue(heading);
+            if (value !== undefined) {
+                fields[label] = value;
+                break;
+            }
+        }
+    }
+
+    let uri = null;
+    const uriHeading = headings.find((h) => h.innerText.trim() === "URI");
+    if (uriHeading && uriHeading.parentElement) {
+        for (const a of uriHeading.parentElement.querySelectorAll("a")) {
+            const href = a.getAttribute("href");
+            if (
+                href &&
+                (href.includes("hdl.handle.net") ||
+                    href.includes("doi.org") ||
+                    (href.includes("openknowledge.worldbank.org") &&
+                        href.includes("/handle/")))
+            ) {
+                uri = href;
+                break;
+            }
+        }
+    }
+
+    const titleElement = document.querySelector("h2");
+    const downloadLinks = Array.from(
+        document.querySelectorAll('a[href*="/bitstreams/"]')
+    ).map((e) => ({ href: e.getAttribute("href"), text: (e.innerText || "").trim() }));
+
+    return {
+        title: titleElement ? titleElement.innerText.trim() : null,
+        fields,
+        uri,
+        downloadLinks,
+    };
+}
+"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delay in seconds or an HTTP-date) into seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def build_publication_details(
+    url: HttpUrl, extracted: dict
+) -> Optional[PublicationDetails]:
+    """
+    Validates the raw fields extracted from a publication page and builds a
+    PublicationDetails from them.
+
+    Args:
+        url: The URL of the publication's detail page.
+        extracted: A dict shaped like EXTRACT_DETAILS_JS's result.
+
+    Returns:
+        A PublicationDetails object, or None if a required field is missing.
+
+    Raises:
+        ValueError: If the page has no title or no URI.
+    """
+    # Get the title
+    title_text = extracted.get("title")
+    if title_text is None:
+        raise ValueError("No title found")
+    # Remove "Publication:" prefix if present
+    if title_text.startswith("Publication:"):
+        title_text = title_text.replace("Publication:", "").strip()
+
+    fields = extracted.get("fields") or {}
+
+    # Extract field values - fail if essential fields are missing
+    abstract = fields.get("Abstract")
+    if not abstract:
+        logger.warning("Failed to extract abstract for %s - this is required", url)
+        return None
+
+    citation = fields.get("Citation")
+    if not citation:
+        logger.warning("Failed to extract citation for %s - this is required", url)
+        return None
+
+    # Require URI to be found
+    uri_href = extracted.get("uri")
+    if not uri_href:
+        raise ValueError("No URI found")
+    uri = HttpUrl(uri_href)
+
+    # Get download links
+    download_links: List[DownloadLink] = []
+    raw_links = extracted.get("downloadLinks") or []
+    logger.debug("Found %d download links", len(raw_links))
+
+    for raw_link in raw_links:
+        try:
+            download_url = raw_link.get("href")
+            if not download_url:
+                continue  # Skip links without URLs
+
+            text = raw_link.get("text") or ""
+            if not text:
+                continue  # Skip links without text
+
+            # Convert relative URLs to absolute URLs
+            if download_url.startswith("/"):
+                download_url = f"https://openknowledge.worldbank.org{download_url}"
+
+            # At this point, both download_url and text are guaranteed to be non-None strings
+            download_links.append(DownloadLink(url=HttpUrl(download_url), text=text))
+        except Exception:
+            continue
+
+    # Get additional metadata - fail if required fields are missing
+    date = fields.get("Date")
+    published = fields.get("Published")
+    authors = fields.get("Author(s)")
+
+    if not date:
+        logger.warning("Failed to extract date for %s - this is required", url)
+        return None
+    if not published:
+        logger.warning(
+            "Failed to extract published field for %s - this is required", url
+        )
+        return None
+    if not authors:
+        logger.warning("Failed to extract authors for %s - this is required", url)
+        return None
+
+    metadata = PublicationMetadata(
+        date=date,
+        published=published,
+        authors=authors,
+    )
+
+    logger.info("Extracted details for: %s", title_text)
+
+    return PublicationDetails(
+        title=title_text,
+        source_url=url,
+        abstract=abstract,
+        citation=citation,
+        uri=uri,
+        metadata=metadata,
+        download_links=download_links,
+    )
+
+
+def _element_text(element: Tag) -> str:
+    """Approximate an element's innerText: its text with whitespace runs collapsed."""
+    lines = (" ".join(line.split()) for line in element.get_text().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _field_value(heading: Tag) -> tuple[bool, Optional[str]]:
+    """
+    Mirror EXTRACT_DETAILS_JS's fieldValue for a BeautifulSoup h5 heading.
+
+    Returns (found, value); found is False where the JS returns undefined.
+    """
+    parent = heading.parent
+    if parent is not None:
+        passed_heading = False
+        for element in parent.find_all(True):
+            if element is heading:
+                passed_heading = True
+                continue
+            # Tags compare by content, so test ancestry by identity
+            if not passed_heading or any(p is heading for p in element.parents):
+                continue
+            own_text = "".join(element.find_all(string=True, recursive=False))
+            if own_text.strip():
+                return True, _element_text(element) or None
+    following = heading.find_next_sibling()
+    if following is None:
+        return False, None
+    return True, _element_text(following) or None
+
+
+def extract_details_from_html(html: str) -> dict:
+    """Run the EXTRACT_DETAILS_JS extraction over static HTML with BeautifulSoup."""
+    soup = BeautifulSoup(html, "html.parser")
+    headings = soup.find_all("h5")
+
+    fields = {}
+    for label in DETAIL_FIELD_LABELS:
+        for heading in headings:
+            if _element_text(heading) != label:
+                continue
+            found, value = _field_value(heading)
+            if found:
+                fields[label] = value
+                break
+
+    uri = None
+    uri_heading = next((h for h in headings if _element_text(h) == "URI"), None)
+    if uri_heading is not None and uri_heading.parent is not None:
+        for anchor in uri_heading.parent.find_all("a"):
+            href = anchor.get("href")
+            if href and (
+                "hdl.handle.net" in href
+                or "doi.org" in href
+                or ("openknowledge.worldbank.org" in href and "/handle/" in href)
+            ):
+                uri = href
+                break
+
+    title_element = soup.find("h2")
+    download_links = [
+        {"href": a.get("href"), "text": _element_text(a)}
+        for a in soup.select('a[href*="/bitstreams/"]')
+    ]
+
+    return {
+        "title": _element_text(title_element) if title_element else None,
+        "fields": fields,
+        "uri": uri,
+        "downloadLinks": download_links,
+    }
+
+
+def fetch_publication_details_without_browser(
+    url: HttpUrl,
+) -> Optional[PublicationDetails]:
+    """
+    Tries to scrape a publication page from its server-rendered HTML alone.
+
+    Returns None, so the caller falls back to the browser, when the request
+    fails or the page lacks anything we need, including when a SHOW MORE
+    link means some download links aren't in the initial HTML.
+
+    Raises:
+        PublicationNotFound: If the server answered with 404 or 410.
+        RateLimited: If the server answered with 429 or 503.
+    """
+    try:
+        response = _SESSION.get(str(url), timeout=FAST_PATH_TIMEOUT_SECONDS)
+    except requests.RequestException:
+        return None
+
+    # Statuses that tell us what the browser would hit, without launching it
+    if response.status_code in (404, 410):
+        raise PublicationNotFound(f"HTTP {response.status_code} for {url}")
+    if response.status_code in (429, 503):
+        raise RateLimited(
+            response.status_code,
+            parse_retry_after(response.headers.get("Retry-After")),
+        )
+
+    try:
+        if response.status_code != 200:
+            return None
+        if "SHOW MORE" in response.text:
+            return None
+        extracted = extract_details_from_html(response.text)
+        if not extracted["title"] or not extracted["downloadLinks"]:
+            return None
+        return build_publication_details(url, extracted)
+    except Exception:
+        return None
+
+
+async def block_unneeded_resources(route: Route) -> None:
+    """
+    Playwright route handler that aborts requests for BLOCKED_RESOURCE_TYPES or
+    to BLOCKED_HOSTS, and serves scripts and stylesheets from the static cache.
+    """
+    host = urlsplit(route.request.url).hostname or ""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES or any(
+        host == blocked or host.endswith(f".{blocked}") for blocked in BLOCKED_HOSTS
+    ):
+        await route.abort()
+    elif route.request.method == "GET" and urlsplit(route.request.url).path.endswith(
+        STATIC_CACHE_EXTENSIONS
+    ):
+        await fulfill_from_static_cache(route)
+    else:
+        await route.continue_()
+
+
+def is_static_cache_fresh(cached: Path) -> bool:
+    """Whether cached exists and is younger than STATIC_CACHE_MAX_AGE_SECONDS."""
+    try:
+        return time.time() - cached.stat().st_mtime < STATIC_CACHE_MAX_AGE_SECONDS
+    except OSError:
+        return False
+
+
+def write_static_cache(cached: Path, body: bytes) -> None:
+    """Write body to cached via a temp file, so a reader never sees half a file."""
+    STATIC_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = cached.with_name(f"{cached.name}.tmp")
+    tmp_path.write_bytes(body)
+    os.replace(tmp_path, cached)
+
+
+async def fulfill_from_static_cache(route: Route) -> None:
+    """
+    Serve a script or stylesheet from STATIC_CACHE_DIR, fetching it on a miss.
+    Disk I/O runs in a worker thread so it doesn't stall the event loop that
+    drives every open page; if the fetch fails the request continues normally.
+    """
+    url = route.request.url
+    ext = os.path.splitext(urlsplit(url).path)[1]
+    cached = STATIC_CACHE_DIR / f"{hashlib.sha1(url.encode()).hexdigest()}{ext}"
+
+    if await asyncio.to_thread(is_static_cache_fresh, cached):
+        await route.fulfill(path=cached)  # Content type comes from the extension
+        return
+
+    try:
+        response = await route.fetch()
+        body = await response.body()
+    except Exception as e:
+        logger.debug(f"Static cache fetch failed for {url}: {e}")
+        await route.continue_()
+        return
+
+    if response.ok:
+        try:
+            await asyncio.to_thread(write_static_cache, cached, body)
+        except OSError as e:
+            logger.debug(f"Could not cache {url}: {e}")
+    await route.fulfill(response=response, body=body)
+
+
+async def scrape_publication_details_with_retry(
     url: HttpUrl,
     max_retries: int = 5,
     base_delay: float = 10.0,
     max_delay: float = 900.0,
+    context: Optional[BrowserContext] = None,
 ) -> Optional[PublicationDetails]:
     """
-    Scrapes publication details with robust retry logic and exponential backoff.
+    Scrapes publication details with robust retry logic and jittered backoff.
 
     Args:
         url: The URL of the publication's detail page.
         max_retries: Maximum number of retry attempts (default: 5)
         base_delay: Base delay in seconds between retries (default: 10.0)
-        max_delay: Maximum delay in seconds to cap exponential backoff (default: 900.0 = 15 minutes)
+        max_delay: Maximum delay in seconds to cap the backoff (default: 900.0 = 15 minutes)
+        context: Optional shared browser context (see open_scraper_context)
 
     Returns:
         A PublicationDetails object containing all scraped metadata, or None if all attempts fail.
     """
+    # Most pages are fully server-rendered, so try without a browser first. This
+    # also catches dead pages and rate limiting before a browser page is opened
+    rate_limited: Optional[RateLimited] = None
+    try:
+        result = await asyncio.to_thread(fetch_publication_details_without_browser, url)
+    except PublicationNotFound as e:
+        logger.warning("Skipping %s: %s", url, e)
+        return None
+    except RateLimited as e:
+        logger.warning("Rate limited (%d status) on %s", e.status, url)
+        result = None
+        rate_limited = e
+    if result is not None:
+        logger.debug("Scraped %s without a browser", url)
+        return result
+
+    if rate_limited is not None:
+        # Don't open a browser page until the server's rate-limit window passes;
+        # without a Retry-After, wait a jittered base_delay instead
+        if rate_limited.retry_after is not None:
+            delay = rate_limited.retry_after + random.uniform(0, 1)
+        else:
+            delay = random.uniform(base_delay, base_delay * 2)
+        await asyncio.sleep(min(delay, max_delay))
+
+    retry_after: Optional[float] = None
+
+    backoff = base_delay
     for attempt in range(max_retries + 1):  # +1 because we include the initial attempt
         if attempt > 0:
-            # Calculate exponential backoff: base_delay * 2^(attempt-1) + jitter
-            exponential_delay = base_delay * (2 ** (attempt - 1))
-            # Add jitter (random factor between 0.5 and 1.5 of the base delay)
-            jitter = random.uniform(0.5 * base_delay, 1.5 * base_delay)
-            delay = min(exponential_delay + jitter, max_delay)
-
-            print(
-                f"Attempt {attempt + 1}/{max_retries + 1} for {url} (waiting {delay:.1f}s)"
+            if retry_after is not None:
+                # The server told us how long to wait; add a little jitter
+                delay = min(retry_after + random.uniform(0, 1), max_delay)
+            else:
+                # Decorrelated jitter: each wait is drawn between base_delay and
+                # 3x the previous wait, so concurrent retriers spread out
+                backoff = min(random.uniform(base_delay, backoff * 3), max_delay)
+                delay = backoff
+
+            logger.info(
+                "Attempt %d/%d for %s (waiting %.1fs)",
+                attempt + 1,
+                max_retries + 1,
+                url,
+                delay,
             )
-            time.sleep(delay)
+            await asyncio.sleep(delay)
         else:
-            print(f"Attempt {attempt + 1}/{max_retries + 1} for {url}")
+            logger.debug("Attempt %d/%d for %s", attempt + 1, max_retries + 1, url)
 
-        result = scrape_publication_details(url)
+        try:
+            result = await scrape_publication_details(url, context)
+            retry_after = None
+        except RateLimited as e:
+            logger.warning("Rate limited (%d status) on %s", e.status, url)
+            result = None
+            retry_after = e.retry_after
 
         if result is not None:
             # Success - we got valid data
             if attempt > 0:
-                print(f"Success on attempt {attempt + 1}")
+                logger.info("Success on attempt %d for %s", attempt + 1, url)
 
             # Add a brief pause after successful request to be respectful
             brief_pause = random.uniform(
                 2.0, 5.0
             )  # Always add some delay between requests
-            print(
-                f"Adding brief pause of {brief_pause:.1f}s after successful request..."
+            logger.debug(
+                "Adding brief pause of %.1fs after successful request...", brief_pause
             )
-            time.sleep(brief_pause)
+            await asyncio.sleep(brief_pause)
 
             return result
 
         # Check if we should retry
         if attempt < max_retries:
-            print(f"Attempt {attempt + 1} failed, will retry...")
+            logger.info("Attempt %d failed for %s, will retry...", attempt + 1, url)
         else:
-            print(f"All {max_retries + 1} attempts failed for {url}")
-            print(
-                "Consider waiting longer before retrying this URL, or check if the server is blocking requests"
+            logger.warning(
+                "All %d attempts failed for %s. Consider waiting longer before "
+                "retrying this URL, or check if the server is blocking requests",
+                max_retries + 1,
+                url,
             )
 
     return None
 
 
-def scrape_publication_details(url: HttpUrl) -> Optional[PublicationDetails]:
+@asynccontextmanager
+async def open_scraper_browser() -> AsyncIterator[Browser]:
+    """Launch Chromium for scraping OKR pages; it is closed when the block exits."""
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True, args=list(LAUNCH_ARGS))
+        try:
+            yield browser
+        finally:
+            try:
+                await browser.close()
+            except:
+                pass  # Ignore errors during cleanup
+
+
+async def new_scraper_context(browser: Browser) -> BrowserContext:
+    """Create a browser context configured for scraping OKR pages."""
+    # Create context with more realistic browser settings and longer timeouts
+    context = await browser.new_context(**CONTEXT_OPTIONS)
+
+    # Set longer default timeouts
+    context.set_default_timeout(60000)  # 60 seconds
+    context.set_default_navigation_timeout(60000)  # 60 seconds
+
+    # Don't download assets we never read, so the page settles sooner
+    await context.route("**/*", block_unneeded_resources)
+
+    # Hide automation indicators
+    await context.add_init_script(STEALTH_INIT_SCRIPT)
+
+    return context
+
+
+@asynccontextmanager
+async def open_scraper_context() -> AsyncIterator[BrowserContext]:
+    """
+    Launch Chromium and yield a browser context configured for scraping OKR pages.
+
+    Reusing one context across many publication pages avoids paying the browser
+    startup cost per page. The browser is closed when the block exits.
+    """
+    async with open_scraper_browser() as browser:
+        yield await new_scraper_context(browser)
+
+
+class RecyclingScraperContext:
+    """
+    Shares one scraper context among concurrent pages, replacing it after
+    MAX_PAGES_PER_CONTEXT pages so a long run doesn't accumulate browser state.
+
+    A replaced context stays open until its last page finishes, so recycling
+    never waits for slow pages (e.g. a URL in backoff) to drain.
+    """
+
+    def __init__(self, browser: Browser, max_pages: int = MAX_PAGES_PER_CONTEXT):
+        self._browser = browser
+        self._max_pages = max_pages
+        self._lock = asyncio.Lock()
+        self._current: Optional[BrowserContext] = None
+        self._pages_started = 0
+        # Pages still open in each context, current or retired
+        self._open_pages: dict[BrowserContext, int] = {}
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[BrowserContext]:
+        """Yield the context to scrape one page in, counting it toward recycling."""
+        context = await self._acquire()
+        try:
+            yield context
+        finally:
+            await self._release(context)
+
+    async def close(self) -> None:
+        """Close every context still open."""
+        async with self._lock:
+            for context in self._open_pages:
+                await context.close()
+            self._open_pages.clear()
+            self._current = None
+
+    async def _acquire(self) -> BrowserContext:
+        async with self._lock:
+            if self._current is None or self._pages_started >= self._max_pages:
+                retired = self._current
+                self._current = await new_scraper_context(self._browser)
+                self._pages_started = 0
+                self._open_pages[self._current] = 0
+                if retired is not None and self._open_pages[retired] == 0:
+                    del self._open_pages[retired]
+                    await retired.close()
+            self._pages_started += 1
+            self._open_pages[self._current] += 1
+            return self._current
+
+    async def _release(self, context: BrowserContext) -> None:
+        async with self._lock:
+            self._open_pages[context] -= 1
+            if context is not self._current and self._open_pages[context] == 0:
+                del self._open_pages[context]
+                await context.close()
+
+
+async def scrape_publication_details(
+    url: HttpUrl, context: Optional[BrowserContext] = None
+) -> Optional[PublicationDetails]:
     """
     Scrapes the details for a single publication page.
 
     Args:
         url: The URL of the publication's detail page.
+        context: A browser context from open_scraper_context to open the page in.
+            If omitted, a browser is launched (and closed) just for this page.
 
     Returns:
         A PublicationDetails object containing all scraped metadata.
         Returns None if scraping fails.
+
+    Raises:
+        RateLimited: If the server answered with 429 or 503.
     """
-    with sync_playwright() as p:
+    if context is None:
         try:
-            browser = p.chromium.launch(
-                headless=True,
-                args=[
-                    "--no-sandbox",
-                    "--disable-blink-features=AutomationControlled",
-                    "--disable-web-security",
-                    "--disable-dev-shm-usage",
-                    "--disable-gpu",
-                    "--disable-background-timer-throttling",
-                    "--disable-backgrounding-occluded-windows",
-                    "--disable-renderer-backgrounding",
-                    "--disable-features=TranslateUI",
-                    "--disable-ipc-flooding-protection",
-                ],
-            )
+            async with open_scraper_context() as own_context:
+                return await scrape_publication_details(url, own_context)
+        except RateLimited:
+            raise
+        except Exception as e:
+            logger.error("Browser initialization error: %s", e)
+            return None
 
-            # Create context with more realistic browser settings and longer timeouts
-            context = browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                viewport={"width": 1920, "height": 1080},
-                locale="en-US",
-                timezone_id="America/New_York",
-                extra_http_headers={
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-                    "Accept-Language": "en-US,en;q=0.9",
-                    "Accept-Encoding": "gzip, deflate, br",
-                    "DNT": "1",
-                    "Connection": "keep-alive",
-                    "Upgrade-Insecure-Requests": "1",
-                    "Sec-Fetch-Dest": "document",
-                    "Sec-Fetch-Mode": "navigate",
-                    "Sec-Fetch-Site": "none",
-                    "Sec-Fetch-User": "?1",
-                    "Cache-Control": "max-age=0",
-                },
-            )
+    page = await context.new_page()
 
-            # Set longer default timeouts
-            context.set_default_timeout(60000)  # 60 seconds
-            context.set_default_navigation_timeout(60000)  # 60 seconds
-
-            page = context.new_page()
-
-            # Hide automation indicators
-            page.add_init_script(
-                """
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined,
-                });
-                
-                // Remove automation indicators
-                delete window.cdc_adoQpoasnfa76pfcZLmcfl_Array;
-                delete window.cdc_adoQpoasnfa76pfcZLmcfl_Promise;
-                delete window.cdc_adoQpoasnfa76pfcZLmcfl_Symbol;
-            """
-            )
+    try:
+        logger.debug("Navigating to: %s", url)
+        response = await page.goto(
+            str(url), wait_until="domcontentloaded", timeout=60000
+        )  # 60 seconds timeout
 
-            try:
-                print(f"Navigating to: {url}")
-                response = page.goto(
-                    str(url), wait_until="domcontentloaded", timeout=60000
-                )  # 60 seconds timeout
-
-                # Check if we got rate limited or other HTTP errors
-                if response:
-                    if response.status == 429:
-                        print(f"Rate limited (429 status).")
-                        return None
-                    elif response.status == 503:
-                        print(f"Service unavailable (503 status).")
-                        return None
-                    elif response.status >= 400:
-                        print(f"HTTP error {response.status}")
-                        return None
-
-                # Wait for the page to load with longer timeout
-                page.wait_for_load_state("networkidle", timeout=30000)  # 30 seconds
-
-                # Wait for page content to load with much longer timeout and better error detection
-                print("Waiting for page content to load...")
-                try:
-                    page.wait_for_selector(
-                        'h2, h5, a[href*="/bitstreams/"]', timeout=30000
-                    )  # 30 seconds
-                    print("Page content loaded")
-                except Exception as e:
-                    print(f"Content loading timeout: {e}")
-                    # Check if this looks like a rate limiting or error page
-                    title = page.title()
-                    body_text = ""
-                    try:
-                        body_text = page.locator("body").inner_text().lower()
-                    except:
-                        pass
-
-                    # Enhanced rate limiting detection
-                    rate_limit_indicators = [
-                        "429",
-                        "too many requests",
-                        "rate limit",
-                        "slow down",
-                        "try again later",
-                        "temporarily unavailable",
-                        "service unavailable",
-                        "connection refused",
-                        "server error",
-                    ]
-
-                    if any(
-                        indicator in title.lower()
-                        for indicator in rate_limit_indicators
-                    ) or any(
-                        indicator in body_text for indicator in rate_limit_indicators
-                    ):
-                        print("Detected rate limiting or server issues.")
-                        return None
-
-                    # If it's just a timeout but page seems to have loaded partially, continue
-                    print("Continuing with partial page load...")
-
-                # Check page title for common error indicators
-                title = page.title()
-                print(f"Page title: {title}")
-
-                # Enhanced error detection
-                error_indicators = [
-                    "429",
-                    "too many requests",
-                    "error",
-                    "not found",
-                    "unavailable",
-                    "refused",
-                ]
-                if any(indicator in title.lower() for indicator in error_indicators):
-                    print(f"Detected error page based on title: {title}")
-                    return None
-
-                # Use Python Playwright API to extract all required information
-                print("Extracting publication details...")
-
-                # Get the title
-                title_element = page.locator("h2").first
-                if title_element.count() > 0:
-                    title_text = title_element.inner_text().strip()
-                    # Remove "Publication:" prefix if present
-                    if title_text.startswith("Publication:"):
-                        title_text = title_text.replace("Publication:", "").strip()
-                else:
-                    raise ValueError("No title found")
-
-                # Helper function to get field value based on h5 heading
-                def get_field_value(label: str) -> Optional[str]:
-                    try:
-                        # Find h5 heading with the label
-                        headings = page.locator("h5")
-                        heading_count = headings.count()
-
-                        for i in range(heading_count):
-                            heading = headings.nth(i)
-                            if heading.inner_text().strip() == label:
-                                # Found the heading, now find the next sibling with content
-                                try:
-                                    # Try to find the next element with content
-                                    parent = heading.locator("xpath=..")
-                                    following_elements = parent.locator(
-                                        f'xpath=.//*[normalize-space(text()) != ""][position() > count(h5[normalize-space(text()) = "{label}"]/preceding-sibling::*) + 1]'
-                                    )
-
-                                    if following_elements.count() > 0:
-                                        content = following_elements.first.inner_text().strip()
-                                        return content if content else None
-
-                                    # Fallback: try next sibling elements
-                                    next_sibling = heading.locator(
-                                        "xpath=following-sibling::*[1]"
-                                    )
-                                    if next_sibling.count() > 0:
-                                        content = next_sibling.inner_text().strip()
-                                        return content if content else None
-
-                                except Exception:
-                                    pass
-                        return None
-                    except Exception as e:
-                        print(f"Error getting field value for {label}: {e}")
-                        return None
-
-                # Extract field values - fail if essential fields are missing
-                abstract = get_field_value("Abstract")
-                if not abstract:
-                    print("Failed to extract abstract - this is required")
-                    return None
-
-                citation = get_field_value("Citation")
-                if not citation:
-                    print("Failed to extract citation - this is required")
-                    return None
-
-                # Get URI
-                uri: Optional[HttpUrl] = None
-                headings = page.locator("h5")
-                heading_count = headings.count()
-
-                for i in range(heading_count):
-                    heading = headings.nth(i)
-                    if heading.inner_text().strip() == "URI":
-                        # Find the link in the following content
-                        parent = heading.locator("xpath=..")
-                        uri_links = parent.locator("a")
-                        uri_link_count = uri_links.count()
-
-                        for j in range(uri_link_count):
-                            link = uri_links.nth(j)
-                            href = link.get_attribute("href")
-                            if href and (
-                                "hdl.handle.net" in href
-                                or "doi.org" in href
-                                or (
-                                    "openknowledge.worldbank.org" in href
-                                    and "/handle/" in href
-                                )
-                            ):
-                                uri = HttpUrl(href)
-                                break
-                        break
-
-                # Require URI to be found
-                if not uri:
-                    raise ValueError("No URI found")
-
-                # Get download links with enhanced functionality
-                try:
-                    download_links: List[DownloadLink] = []
-
-                    # First, try to click SHOW MORE button if present
-                    try:
-                        show_more_button = page.locator('a:has-text("SHOW MORE")')
-                        if (
-                            show_more_button.count() > 0
-                            and show_more_button.is_visible()
-                        ):
-                            print("Found SHOW MORE button, clicking...")
-                            show_more_button.click()
-
-                            # Wait for content to load
-                            import time
-
-                            time.sleep(2)
-                            try:
-                                page.wait_for_load_state("networkidle", timeout=15000)
-                            except:
-                                pass  # Continue even if timeout
-
-                            print("Successfully clicked SHOW MORE button")
-                    except Exception as e:
-                        print(f"Error trying to click SHOW MORE button: {e}")
-
-                    # Extract all download links
-                    bitstream_links = page.locator('a[href*="/bitstreams/"]')
-                    link_count = bitstream_links.count()
-                    print(f"Found {link_count} download links")
-
-                    for i in range(link_count):
-                        link = bitstream_links.nth(i)
-                        try:
-                            url_attr = link.get_attribute("href")
-                            if not url_attr:
-                                continue  # Skip links without URLs
-                            download_url = url_attr  # Use a different variable name
-
-                            text = link.inner_text().strip()
-                            if not text:
-                                continue  # Skip links without text
-
-                            # Convert relative URLs to absolute URLs
-                            if download_url.startswith("/"):
-                                download_url = (
-                                    f"https://openknowledge.worldbank.org{download_url}"
-                                )
-
-                            # At this point, both download_url and text are guaranteed to be non-None strings
-                            download_links.append(
-                                DownloadLink(url=HttpUrl(download_url), text=text)
-                            )
-                        except Exception:
-                            continue
-
-                except Exception as e:
-                    print(f"Error extracting download links: {e}")
-                    download_links = []
-
-                # Get additional metadata - fail if required fields are missing
-                date = get_field_value("Date")
-                published = get_field_value("Published")
-                authors = get_field_value("Author(s)")
-
-                if not date:
-                    print("Failed to extract date - this is required")
-                    return None
-                if not published:
-                    print("Failed to extract published field - this is required")
-                    return None
-                if not authors:
-                    print("Failed to extract authors - this is required")
-                    return None
-
-                metadata = PublicationMetadata(
-                    date=date,
-                    published=published,
-                    authors=authors,
+        # Check if we got rate limited or other HTTP errors
+        if response:
+            if response.status in (429, 503):
+                raise RateLimited(
+                    response.status,
+                    parse_retry_after(response.headers.get("retry-after")),
                 )
+            elif response.status >= 400:
+                logger.warning("HTTP error %d on %s", response.status, url)
+                return None
 
-                print(f"Extracted details for: {title_text}")
+        # Wait for page content to load with much longer timeout and better error
+        # detection. This waits for the elements we extract rather than for
+        # network idle, which background traffic can hold off for many seconds
+        logger.debug("Waiting for page content to load...")
+        try:
+            await page.wait_for_function(PAGE_READY_JS, timeout=30000)  # 30 seconds
+            logger.debug("Page content loaded")
+        except Exception as e:
+            logger.warning("Content loading timeout on %s: %s", url, e)
+            # Check if this looks like a rate limiting or error page
+            title = await page.title()
+            body_text = ""
+            try:
+                body_text = await page.evaluate(BODY_TEXT_PREFIX_JS)
+            except:
+                pass
 
-                return PublicationDetails(
-                    title=title_text,
-                    source_url=url,
-                    abstract=abstract,
-                    citation=citation,
-                    uri=uri,
-                    metadata=metadata,
-                    download_links=download_links,
-                )
+            # Enhanced rate limiting detection
+            if _RATE_LIMIT_RE.search(title) or _RATE_LIMIT_RE.search(body_text):
+                logger.warning("Detected rate limiting or server issues on %s", url)
+                return None
 
-            except Exception as e:
-                error_msg = str(e)
-                print(f"Error during scraping of {url}: {error_msg}")
-
-                # Check for connection-related errors that indicate rate limiting or temporary issues
-                temporary_errors = [
-                    "ERR_CONNECTION_REFUSED",
-                    "ERR_CONNECTION_RESET",
-                    "ERR_CONNECTION_FAILED",
-                    "ERR_NETWORK_CHANGED",
-                    "ERR_TIMED_OUT",
-                    "net::",
-                    "Connection refused",
-                    "Connection reset",
-                    "Timeout",
-                    "429",
-                    "503",
-                    "502",
-                    "504",
-                ]
-
-                # Check for permanent errors that shouldn't be retried
-                permanent_errors = [
-                    "404",
-                    "Not Found",
-                    "ERR_NAME_NOT_RESOLVED",
-                    "ERR_INVALID_URL",
-                ]
-
-                is_temporary_error = any(
-                    temp_err in error_msg for temp_err in temporary_errors
-                )
-                is_permanent_error = any(
-                    perm_err in error_msg for perm_err in permanent_errors
-                )
+            # If it's just a timeout but page seems to have loaded partially, continue
+            logger.debug("Continuing with partial page load...")
 
-                if is_permanent_error:
-                    print("Detected permanent error - will not retry")
-                    return None
-                elif is_temporary_error:
-                    print(
-                        "Detected temporary error - likely rate limiting or server issues"
-                    )
+        # Check page title for common error indicators
+        title = await page.title()
+        logger.debug("Page title: %s", title)
 
-                return None
+        # Enhanced error detection
+        if _ERROR_TITLE_RE.search(title):
+            logger.warning("Detected error page based on title: %s", title)
+            return None
 
+        # First, try to click SHOW MORE button if present so that every
+        # download link is in the DOM before we extract
+        try:
+            show_more_button = page.locator('a:has-text("SHOW MORE")')
+            if (
+                await show_more_button.count() > 0
+                and await show_more_button.is_visible()
+            ):
+                logger.debug("Found SHOW MORE button, clicking...")
+                links_before = await page.locator(BITSTREAM_LINK_SELECTOR).count()
+                await show_more_button.click()
+
+                # Wait for the extra download links to render
+                try:
+                    await page.wait_for_function(
+                        MORE_LINKS_LOADED_JS, arg=links_before, timeout=15000
+                    )
+                except:
+                    pass  # Continue even if timeout
+
+                logger.debug("Successfully clicked SHOW MORE button")
         except Exception as e:
-            print(f"Browser initialization error: {e}")
+            logger.warning("Error trying to click SHOW MORE button on %s: %s", url, e)
+
+        # Extract all required information in a single in-page DOM walk
+        logger.debug("Extracting publication details...")
+        extracted = await page.evaluate(EXTRACT_DETAILS_JS, DETAIL_FIELD_LABELS)
+
+        return build_publication_details(url, extracted)
+
+    except RateLimited:
+        raise
+    except Exception as e:
+        error_msg = str(e)
+        logger.warning("Error during scraping of %s: %s", url, error_msg)
+
+        # Check for connection-related errors that indicate rate limiting or
+        # temporary issues, and for permanent errors that shouldn't be retried
+        is_temporary_error = _TEMPORARY_ERROR_RE.search(error_msg) is not None
+        is_permanent_error = _PERMANENT_ERROR_RE.search(error_msg) is not None
+
+        if is_permanent_error:
+            logger.warning("Detected permanent error - will not retry")
             return None
+        elif is_temporary_error:
+            logger.warning(
+                "Detected temporary error - likely rate limiting or server issues"
+            )
+
+        return None
+    finally:
+        try:
+            await page.close()
+        except:
+            pass  # Ignore errors during cleanup
+
+
+async def scrape_many_publication_details(
+    urls: List[HttpUrl],
+    max_concurrent_pages: int = MAX_CONCURRENT_PAGES,
+    on_result: Optional[
+        Callable[[int, Optional[PublicationDetails]], Awaitable[None]]
+    ] = None,
+) -> List[Optional[PublicationDetails]]:
+    """
+    Scrapes many publication pages concurrently in one shared browser.
+
+    At most max_concurrent_pages pages are open at a time, and each page start
+    is staggered by a short random delay to stay polite to the server. The
+    browser context is replaced every MAX_PAGES_PER_CONTEXT pages.
+
+    Args:
+        urls: The URLs of the publications' detail pages.
+        max_concurrent_pages: Maximum number of pages scraped at once.
+        on_result: Optional callback awaited with (index into urls, result) as
+            soon as each URL is done, so callers can save results as they
+            arrive rather than after the whole batch.
+
+    Returns:
+        One entry per URL, in the same order: the PublicationDetails, or None if
+        all attempts for that URL failed.
+    """
+    semaphore = asyncio.Semaphore(max_concurrent_pages)
+
+    async def scrape(
+        contexts: RecyclingScraperContext, index: int, url: HttpUrl
+    ) -> Optional[PublicationDetails]:
+        async with semaphore:
+            # Stagger page starts rather than hitting the server in bursts
+            await asyncio.sleep(random.uniform(3.0, 7.0))
+            async with contexts.page() as context:
+                result = await scrape_publication_details_with_retry(
+                    url, context=context
+                )
+        # Outside the semaphore, so the next page starts while this is handled
+        if on_result is not None:
+            await on_result(index, result)
+        return result
+
+    async with open_scraper_browser() as browser:
+        # Contexts are swapped as pages finish, with no barrier between them
+        contexts = RecyclingScraperContext(browser)
+        try:
+            results = await asyncio.gather(
+                *(scrape(contexts, index, url) for index, url in enumerate(urls))
+            )
         finally:
-            try:
-                browser.close()
-            except:
-                pass  # Ignore errors during cleanup
+            await contexts.close()
+    return results
 
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
     # Example usage of the main function
     test_url = HttpUrl("https://openknowledge.worldbank.org/publication/example")
-    result = scrape_publication_details_with_retry(test_url)
+    result = asyncio.run(scrape_publication_details_with_retry(test_url))
     if result:
         print("Successfully extracted publication details:")
         print(result.model_dump_json(indent=2))
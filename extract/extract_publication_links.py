@@ -51,8 +51,12 @@ def save_links_to_json(links: List[PublicationLink], json_path: str) -> None:
     # Convert to serializable format
     data = [link.model_dump(mode="json") for link in links]
 
-    with open(json_path, "w", encoding="utf-8") as f:
+    # Write to a temp file and swap it in, so an interrupted run can't leave
+    # a truncated links file behind
+    tmp_path = f"{json_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, json_path)
 
     print(f"Saved {len(links)} publication links to {json_path}")
 
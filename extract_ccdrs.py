@@ -17,9 +17,8 @@ Arguments:
     --openai    Run OpenAI upload after other stages
 """
 
+import asyncio
 import os
-import time
-import random
 from typing import List, Optional
 from pathlib import Path
 from sqlmodel import Session, select
@@ -29,11 +28,11 @@ from load.db import engine, check_schema_sync
 from load.schema import Publication, Document
 from extract.extract_publication_links import get_all_publication_links, PublicationLink
 from extract.extract_publication_details import (
-    scrape_publication_details_with_retry,
+    scrape_many_publication_details,
     PublicationDetails,
 )
 from extract.classify_mime_types import (
-    get_file_type_from_url,
+    get_file_types_from_urls,
     PublicationDetailsWithFileInfo,
 )
 from extract.classify_document_types import (
@@ -63,6 +62,64 @@ def identify_new_publications(
     return new_links
 
 
+def process_new_publication(
+    link_info: PublicationLink,
+    pub_details: Optional[PublicationDetails],
+    session: Session,
+) -> None:
+    """Probes, classifies and persists one newly scraped publication."""
+    print(f"\nProcessing new publication: {link_info.title}")
+
+    # a. Check the scraped details
+    if not pub_details or not pub_details.download_links:
+        print("  -> Failed to scrape details or no download links found. Skipping.")
+        return
+
+    # b. Get MIME types (lightweight HEAD/GET request)
+    pub_details_with_info: PublicationDetailsWithFileInfo = (
+        PublicationDetailsWithFileInfo(
+            title=pub_details.title,
+            source_url=pub_details.source_url,
+            abstract=pub_details.abstract,
+            citation=pub_details.citation,
+            uri=pub_details.uri,
+            metadata=pub_details.metadata,
+            download_links=get_file_types_from_urls(pub_details.download_links),
+        )
+    )
+
+    # c. Classify Links
+    pub_details_with_classification: PublicationDetailsWithClassification = (
+        PublicationDetailsWithClassification(
+            title=pub_details_with_info.title,
+            source_url=pub_details_with_info.source_url,
+            abstract=pub_details_with_info.abstract,
+            citation=pub_details_with_info.citation,
+            uri=pub_details_with_info.uri,
+            metadata=pub_details_with_info.metadata,
+            download_links=classify_download_links(
+                pub_details_with_info.download_links, True
+            ),
+        )
+    )
+
+    # d. Validate that there's at least one download link to process
+    if not pub_details_with_classification.download_links:
+        print("  -> No downloadable documents found. Skipping publication.")
+        return
+
+    # e. Persist to Database in a transaction
+    try:
+        persist_publication(pub_details_with_classification, session)
+        session.commit()
+        print(
+            f"  -> Successfully saved to database with {len(pub_details_with_classification.download_links)} downloadable documents."
+        )
+    except Exception as e:
+        print(f"  -> ERROR: Failed to save to database. Rolling back. Error: {e}")
+        session.rollback()
+
+
 def run_stage_1_metadata_ingestion() -> None:
     """
     Orchestrates the scraping and persistence of publication metadata.
@@ -90,74 +147,30 @@ def run_stage_1_metadata_ingestion() -> None:
             print("--- Stage 1 Complete ---")
             return
 
-        # 3. Process Each New Publication
-        for idx, link_info in enumerate(new_links_to_process):
-            print(f"\nProcessing new publication: {link_info.title}")
-
-            # Add a polite delay between requests (except for the first one)
-            if idx > 0:
-                delay = random.uniform(3.0, 7.0)  # 3-7 seconds between requests
-                print(f"Waiting {delay:.1f}s before next request to be respectful...")
-                time.sleep(delay)
-
-            # a. Scrape Details
-            pub_details: Optional[PublicationDetails] = (
-                scrape_publication_details_with_retry(link_info.url)
-            )
-            if not pub_details or not pub_details.download_links:
-                print(
-                    "  -> Failed to scrape details or no download links found. Skipping."
-                )
-                continue
-
-            # b. Get MIME types (lightweight HEAD/GET request)
-            pub_details_with_info: PublicationDetailsWithFileInfo = (
-                PublicationDetailsWithFileInfo(
-                    title=pub_details.title,
-                    source_url=pub_details.source_url,
-                    abstract=pub_details.abstract,
-                    citation=pub_details.citation,
-                    uri=pub_details.uri,
-                    metadata=pub_details.metadata,
-                    download_links=[
-                        get_file_type_from_url(link)
-                        for link in pub_details.download_links
-                    ],
+        # 3. Scrape Details for every new publication, a few pages at a time
+        #    in one shared browser, and 4. process each one as soon as its
+        #    page is done, so an interrupted run keeps what it already saved.
+        #    Processing blocks (HTTP probes, DB writes), so it runs in a worker
+        #    thread, one publication at a time since the session is shared
+        process_lock = asyncio.Lock()
+
+        async def on_scraped(
+            index: int, pub_details: Optional[PublicationDetails]
+        ) -> None:
+            async with process_lock:
+                await asyncio.to_thread(
+                    process_new_publication,
+                    new_links_to_process[index],
+                    pub_details,
+                    session,
                 )
-            )
 
-            # c. Classify Links
-            pub_details_with_classification: PublicationDetailsWithClassification = (
-                PublicationDetailsWithClassification(
-                    title=pub_details_with_info.title,
-                    source_url=pub_details_with_info.source_url,
-                    abstract=pub_details_with_info.abstract,
-                    citation=pub_details_with_info.citation,
-                    uri=pub_details_with_info.uri,
-                    metadata=pub_details_with_info.metadata,
-                    download_links=classify_download_links(
-                        pub_details_with_info.download_links, True
-                    ),
-                )
+        asyncio.run(
+            scrape_many_publication_details(
+                [link_info.url for link_info in new_links_to_process],
+                on_result=on_scraped,
             )
-
-            # d. Validate that there's at least one download link to process
-            if not pub_details_with_classification.download_links:
-                print("  -> No downloadable documents found. Skipping publication.")
-                continue
-
-            # 4. Persist to Database in a transaction
-            try:
-                persist_publication(pub_details_with_classification, session)
-                session.commit()
-                print(
-                    f"  -> Successfully saved to database with {len(pub_details_with_classification.download_links)} downloadable documents."
-                )
-            except Exception as e:
-                print(
-                    f"  -> ERROR: Failed to save to database. Rolling back. Error: {e}"
-                )
-                session.rollback()
+        )
 
     print("--- Stage 1 Complete ---")
 
@@ -204,11 +217,11 @@ def run_stage_2_file_processing() -> None:
             )
             try:
                 # a. Download File
-                local_path_initial = download_document_file(doc)
+                local_path_initial, downloaded_size = download_document_file(doc)
 
                 # b. Convert & Get File Size
                 local_path_final, file_size = analyze_and_prepare_file(
-                    local_path_initial
+                    local_path_initial, downloaded_size
                 )
 
                 # c. Upload to S3
@@ -251,7 +264,6 @@ def run_openai_upload() -> None:
     print("--- Running OpenAI Upload ---")
 
     try:
-        import asyncio
         from load.upload_pdfs_to_openai import main as openai_upload_main
 
         # Run the existing OpenAI upload logic
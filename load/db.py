@@ -1,4 +1,6 @@
 import os
+import json
+import hashlib
 from sqlmodel import create_engine
 import requests
 import difflib
@@ -18,8 +20,42 @@ def get_database_url():
     return f"postgresql://{user}:{password}@{host}:{port}/{db}"
 
 
-# Create database engine
-engine = create_engine(get_database_url())
+# Create database engine. Pre-ping and recycling keep long runs (Stage 1 holds
+# its session across minutes of scraping) from hitting server-closed connections;
+# the pool covers the worker threads that query alongside the main thread
+engine = create_engine(
+    get_database_url(),
+    pool_size=10,
+    max_overflow=10,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+)
+
+# Records the master schema ETag from the last successful sync check, so reruns
+# with an unchanged local schema can revalidate with a bodyless 304
+SCHEMA_SYNC_CACHE = Path("data/schema_sync_cache.json")
+
+
+def _load_schema_sync_cache(local_sha256: str) -> dict:
+    """Return the cached sync record if it was made against this local schema."""
+    try:
+        with open(SCHEMA_SYNC_CACHE, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("local_sha256") != local_sha256:
+        return {}
+    return cache
+
+
+def _save_schema_sync_cache(local_sha256: str, etag: str) -> None:
+    """Persist the ETag of a master schema that matched the local schema."""
+    try:
+        SCHEMA_SYNC_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        with open(SCHEMA_SYNC_CACHE, "w", encoding="utf-8") as f:
+            json.dump({"local_sha256": local_sha256, "etag": etag}, f)
+    except OSError as e:
+        print(f"Warning: could not write schema sync cache: {e}")
 
 
 def check_schema_sync():
@@ -29,14 +65,6 @@ def check_schema_sync():
     print(f"{'=' * 60}")
 
     try:
-        # Fetch master schema from GitHub
-        master_url = "https://raw.githubusercontent.com/Teal-Insights/ccdr-explorer-api/refs/heads/main/db/schema.py"
-        print(f"Fetching master schema from: {master_url}")
-
-        response = requests.get(master_url, timeout=10)
-        response.raise_for_status()
-        master_schema = response.text
-
         # Read local schema
         local_schema_path = Path("load/schema.py")
         if not local_schema_path.exists():
@@ -44,10 +72,30 @@ def check_schema_sync():
 
         with open(local_schema_path, "r", encoding="utf-8") as f:
             local_schema = f.read()
+        local_sha256 = hashlib.sha256(local_schema.strip().encode("utf-8")).hexdigest()
+
+        # Fetch master schema from GitHub, revalidating against the last known-good ETag
+        master_url = "https://raw.githubusercontent.com/Teal-Insights/ccdr-explorer-api/refs/heads/main/db/schema.py"
+        print(f"Fetching master schema from: {master_url}")
+
+        headers = {}
+        cached_etag = _load_schema_sync_cache(local_sha256).get("etag")
+        if cached_etag:
+            headers["If-None-Match"] = cached_etag
+
+        response = requests.get(master_url, headers=headers, timeout=10)
+        if response.status_code == 304:
+            print("✅ Schema is in sync with master (unchanged since last check)")
+            return True
+        response.raise_for_status()
+        master_schema = response.text
 
         # Compare schemas
         if master_schema.strip() == local_schema.strip():
             print("✅ Schema is in sync with master")
+            etag = response.headers.get("ETag")
+            if etag:
+                _save_schema_sync_cache(local_sha256, etag)
             return True
         else:
             print("❌ Schema differs from master")
@@ -338,15 +338,17 @@ async def main():
         f"Using vector store ID: {vector_store_id} for assistant {assistant_id}"
     )
 
-    # Step 1: Get all Document IDs from database
-    all_doc_ids = get_all_document_ids()
+    # Steps 1 & 2: Get all Document IDs from the database while listing the
+    # existing document IDs in the OpenAI vector store. The DB query runs in a
+    # worker thread so its latency is hidden behind the paginated API calls.
+    all_doc_ids, existing_doc_ids = await asyncio.gather(
+        asyncio.to_thread(get_all_document_ids),
+        get_existing_files_by_doc_id(vector_store_id, client),
+    )
     if not all_doc_ids:
         logger.info("No documents found in database. Nothing to upload.")
         return
 
-    # Step 2: Get existing document IDs from OpenAI vector store
-    existing_doc_ids = await get_existing_files_by_doc_id(vector_store_id, client)
-
     # Step 3: Find missing document IDs
     missing_doc_ids = set(all_doc_ids) - existing_doc_ids
 
@@ -1,6 +1,6 @@
 from datetime import datetime, date
 
-from sqlmodel import Session
+from sqlmodel import Session, select
 
 from extract.classify_document_types import PublicationDetailsWithClassification
 from load.schema import Publication, Document, DocumentType
@@ -13,13 +13,24 @@ def persist_publication(
     Creates SQLModel objects for a publication and its documents and adds them
     to the session. Does NOT commit the session.
 
+    Reprocessing is idempotent: if a publication with the same source URL is
+    already stored, it is returned as-is and nothing is added to the session.
+
     Args:
         pub_data: A dictionary with the complete publication metadata.
         session: The active SQLModel session.
 
     Returns:
-        The created Publication object, ready to be committed.
+        The created (or already existing) Publication object.
     """
+    # Short-circuit on reruns so we never insert a duplicate publication
+    existing = session.exec(
+        select(Publication).where(Publication.source_url == str(pub_data.source_url))
+    ).first()
+    if existing is not None:
+        print(f"  -> Publication already stored (ID: {existing.id}), skipping insert.")
+        return existing
+
     # Create the publication (without ID - will be auto-generated)
     publication = Publication(
         title=pub_data.title,